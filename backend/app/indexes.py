@@ -0,0 +1,139 @@
+# backend/app/indexes.py
+
+import logging
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+# Collections whose indexes enforce invariants rather than only speed up
+# queries: registration relies on the users unique indexes to reject
+# duplicate emails and usernames (see services/auth.register_user).
+REQUIRED_INDEXES = ("users",)
+
+# Indexes backing every query in services/, per collection.
+# Unique indexes on users only cover documents that actually have the field,
+# so older users registered without a username do not collide on null.
+INDEXES = {
+    "entries": [
+        IndexModel([("user", ASCENDING), ("month", ASCENDING), ("date", ASCENDING)], name="user_month_date"),
+        IndexModel(
+            [("user", ASCENDING), ("type", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)],
+            name="user_type_date_id",
+        ),
+        IndexModel([("user", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)], name="user_date_id"),
+    ],
+    "income": [
+        IndexModel([("user", ASCENDING), ("effective_month", ASCENDING)], name="user_effective_month", unique=True),
+    ],
+    "category_totals": [
+        IndexModel(
+            [("user", ASCENDING), ("month", ASCENDING), ("category", ASCENDING)],
+            name="user_month_category",
+            unique=True,
+        ),
+    ],
+    "monthly_rollups": [
+        IndexModel([("user", ASCENDING), ("month", ASCENDING)], name="user_month", unique=True),
+    ],
+    "month_versions": [
+        IndexModel([("user", ASCENDING), ("month", ASCENDING)], name="user_month", unique=True),
+        IndexModel([("updated_at", ASCENDING)], name="updated_at"),
+    ],
+    "advice_jobs": [
+        IndexModel([("status", ASCENDING), ("run_at", ASCENDING)], name="status_run_at"),
+        IndexModel([("user", ASCENDING), ("mode", ASCENDING), ("status", ASCENDING)], name="user_mode_status"),
+        # Finished jobs are removed once they can no longer be polled
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "users": [
+        IndexModel(
+            [("email", ASCENDING)], name="email_unique", unique=True,
+            partialFilterExpression={"email": {"$type": "string"}},
+        ),
+        IndexModel(
+            [("username", ASCENDING)], name="username_unique", unique=True,
+            partialFilterExpression={"username": {"$type": "string"}},
+        ),
+    ],
+}
+
+# Representative filter of each query issued by services/
+QUERY_SHAPES = [
+    ("entries", "dashboard.get_tracker_data", {"user": "u@example.com", "month": "2025-01"}),
+    ("entries", "dashboard.get_user_expenses", {"user": "u@example.com", "type": "expense"}),
+    ("entries", "dashboard.list_entries",
+     {"user": "u@example.com", "date": {"$gte": "2025-01-01", "$lte": "2025-03-31"}, "type": "expense"}),
+    ("income", "dashboard.get_effective_salary", {"user": "u@example.com", "effective_month": {"$lte": "2025-01"}}),
+    ("income", "dashboard.set_monthly_income", {"user": "u@example.com", "effective_month": "2025-01"}),
+    ("category_totals", "dashboard.get_category_totals", {"user": "u@example.com", "month": "2025-01"}),
+    ("category_totals", "dashboard.add_tracker_entry",
+     {"user": "u@example.com", "month": "2025-01", "category": "Food"}),
+    ("monthly_rollups", "dashboard.set_monthly_income", {"user": "u@example.com", "month": "2025-01"}),
+    ("monthly_rollups", "dashboard.get_summary", {"user": "u@example.com", "month": {"$gte": "2025-01", "$lte": "2025-12"}}),
+    ("category_totals", "dashboard.get_summary", {"user": "u@example.com", "month": {"$gte": "2025-01", "$lte": "2025-12"}}),
+    ("income", "dashboard.get_summary", {"user": "u@example.com", "effective_month": {"$lte": "2025-12"}}),
+    ("month_versions", "versions.current", {"user": "u@example.com", "month": {"$in": ["2025-01", "*"]}}),
+    ("month_versions", "advice_jobs.changed_users", {"updated_at": {"$gte": "2025-01-01"}, "month": {"$ne": "*"}}),
+    ("advice_jobs", "advice_jobs.claim", {"status": "queued", "run_at": {"$lte": "2025-01-01"}}),
+    ("advice_jobs", "advice_jobs.submit", {"user": "u@example.com", "mode": "full", "status": "queued"}),
+    ("users", "auth.authenticate_user", {"$or": [{"email": "u@example.com"}, {"username": "u"}]}),
+]
+
+
+async def ensure_indexes(db):
+    """
+    Creates the declared indexes; existing identical indexes are a no-op, so this
+    is safe on every startup. A collection whose index cannot be built (e.g.
+    duplicates blocking a unique index) is logged and skipped, except those in
+    REQUIRED_INDEXES, which raise.
+    """
+    for collection, models in INDEXES.items():
+        try:
+            names = await db[collection].create_indexes(models)
+            logger.info("Indexes ensured on %s: %s", collection, ", ".join(names))
+        except OperationFailure as e:
+            if collection in REQUIRED_INDEXES:
+                raise
+            logger.error("Could not create indexes on %s: %s", collection, e)
+
+
+def _plan_stages(plan):
+    """All stage names of a queryPlanner winning plan, depth first."""
+    stages = [plan.get("stage")]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages.extend(_plan_stages(plan[key]))
+    for child in plan.get("inputStages", []):
+        stages.extend(_plan_stages(child))
+    return stages
+
+
+async def find_unindexed_queries(db):
+    """
+    Explains every query shape and returns (collection, caller, filter) for
+    those whose winning plan contains a collection scan.
+    """
+    unindexed = []
+    for collection, caller, query in QUERY_SHAPES:
+        explain = await db.command({"explain": {"find": collection, "filter": query}, "verbosity": "queryPlanner"})
+        winning_plan = explain["queryPlanner"]["winningPlan"]
+        if "COLLSCAN" in _plan_stages(winning_plan):
+            unindexed.append((collection, caller, query))
+    return unindexed
+
+
+async def bootstrap_indexes(db):
+    """
+    Startup hook: ensure indexes, then warn about any service query that is not index-backed.
+    Raises if the REQUIRED_INDEXES cannot be ensured (including when the
+    database is unreachable), so the API never accepts registrations without
+    the uniqueness guarantee; the query check only logs.
+    """
+    await ensure_indexes(db)
+    try:
+        for collection, caller, query in await find_unindexed_queries(db):
+            logger.warning("Query from %s on %s is not index-backed: %s", caller, collection, query)
+    except PyMongoError as e:
+        logger.error("Index check failed: %s", e)
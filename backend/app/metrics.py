@@ -0,0 +1,235 @@
+# backend/app/metrics.py
+
+"""
+In-process metrics: request latency histograms per route and in-flight
+gauges (MetricsMiddleware), plus timed spans around the expensive stages of a
+request (db, hash, embedding, retrieval, llm). Everything is exposed in the
+Prometheus text format by render() (served on /metrics) and each response
+carries its own stage breakdown in a Server-Timing header.
+
+Values are per worker process; scrape every worker, or run a single one.
+"""
+import bisect
+import contextvars
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1.0):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values) -> float:
+        return self._values.get(label_values, 0.0)
+
+    def collect(self):
+        lines = self.header()
+        for values, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, values)} {value:g}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *label_values, amount: float = 1.0):
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, *label_values, value: float):
+        with self._lock:
+            self._values[label_values] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count], sum
+        self._counts: Dict[tuple, list] = {}
+        self._sums: Dict[tuple, float] = {}
+
+    def observe(self, value: float, *label_values):
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.setdefault(label_values, [0] * (len(self.buckets) + 1))
+            counts[position] += 1
+            self._sums[label_values] = self._sums.get(label_values, 0.0) + value
+
+    def count(self, *label_values) -> int:
+        return sum(self._counts.get(label_values, ()))
+
+    def collect(self):
+        lines = self.header()
+        bucket_labels = self.labels + ("le",)
+        for values in sorted(self._counts):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), self._counts[values]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{self.name}_bucket{_format_labels(bucket_labels, values + (le,))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, values)} {self._sums[values]:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, values)} {cumulative}")
+        return lines
+
+
+REGISTRY = []
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route.", ("method", "route", "status")
+)
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being served.", ("method",))
+STAGE_DURATION = Histogram(
+    "app_stage_duration_seconds", "Time spent in instrumented stages (db, hash, embedding, retrieval, llm).", ("stage",)
+)
+# Hit ratio: rate(cache_lookups_total{result="hit"}) / rate(cache_lookups_total)
+CACHE_LOOKUPS = Counter("cache_lookups_total", "Cache lookups by cache and result (hit, disk_hit or miss).", ("cache", "result"))
+CACHE_ITEMS = Gauge("cache_items", "Entries held by an in-process cache.", ("cache",))
+CACHE_MEMORY = Gauge("cache_memory_bytes", "Size of the values held by an in-process cache.", ("cache",))
+ADMISSION_ACTIVE = Gauge("admission_active", "Work items holding a slot of an admission controller.", ("controller",))
+ADMISSION_WAITING = Gauge("admission_waiting", "Work items queued for a slot of an admission controller.", ("controller",))
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total", "Work items shed by an admission controller, by reason.", ("controller", "reason")
+)
+COALESCED_CALLS = Counter("coalesced_calls_total", "Calls that joined an identical call already in flight.", ("name",))
+# An advice prompt is its fixed template plus these two parts
+PROMPT_TOKENS = Histogram(
+    "advice_prompt_tokens",
+    "Tokens of the parts of advice prompts: product context and expense summary (question).",
+    ("part",),
+    buckets=(50, 100, 200, 400, 800, 1600, 3200, 6400, 12800, 25600, 51200),
+)
+
+
+def render() -> str:
+    """All registered metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
+
+
+# Stage totals of the current request: stage -> [seconds, calls]; None outside requests
+_request_stages: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("request_stages", default=None)
+
+
+@contextmanager
+def span(stage: str):
+    """
+    Times the enclosed block as `stage`. Works in sync and async code; spans
+    opened in worker threads count towards the request when the thread was
+    started with the request's context (see rag_modules.executor.run_blocking).
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_DURATION.observe(elapsed, stage)
+        stages = _request_stages.get()
+        if stages is not None:
+            totals = stages.setdefault(stage, [0.0, 0])
+            totals[0] += elapsed
+            totals[1] += 1
+
+
+def server_timing(stages: dict, total: float) -> str:
+    parts = [f"{stage};dur={seconds * 1000:.1f};desc=\"{calls} call{'s' if calls != 1 else ''}\""
+             for stage, (seconds, calls) in stages.items()]
+    parts.append(f"app;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def route_template(scope) -> str:
+    """
+    Path template of the matched route, e.g. "/api/dashboard/entries", or
+    "unmatched". Routes of a router included with a prefix may report their
+    path without it; the prefix is then recovered from the request path.
+    """
+    template = getattr(scope.get("route"), "path", None)
+    if template is None:
+        return "unmatched"
+    concrete = template
+    for name, value in scope.get("path_params", {}).items():
+        concrete = re.sub(r"\{" + re.escape(name) + r"(:[^}]*)?\}", str(value), concrete)
+    path = scope["path"]
+    if path != concrete and path.endswith(concrete):
+        return path[:len(path) - len(concrete)] + template
+    return template
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency and in-flight requests per route
+    template (never the raw path, to keep label cardinality bounded) and
+    adding a Server-Timing header with the request's stage breakdown.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stages = {}
+        token = _request_stages.set(stages)
+        start = time.perf_counter()
+        status = 500
+        # The route is only known after routing, so in-flight is tracked per method
+        REQUESTS_IN_FLIGHT.inc(scope["method"])
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = server_timing(stages, time.perf_counter() - start)
+                message = {**message, "headers": list(message.get("headers", [])) + [
+                    (b"server-timing", header.encode("latin-1"))
+                ]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            REQUEST_DURATION.observe(time.perf_counter() - start, scope["method"], route_template(scope), status)
+            REQUESTS_IN_FLIGHT.dec(scope["method"])
+            _request_stages.reset(token)
@@ -0,0 +1,62 @@
+# backend/app/responses.py
+
+"""
+Response helpers for the dashboard reads: JSON rendered with orjson (when
+installed) and conditional GET handling for versioned, per-user data.
+"""
+import json
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # optional; the standard library is used without it
+    orjson = None
+
+# Browsers may keep the response but must revalidate it before every use
+REVALIDATE = "private, no-cache"
+
+
+def render_json(content) -> bytes:
+    """
+    JSON bytes rendered by orjson, several times faster than the default
+    encoder on large entry lists. Content should already be JSON types
+    (datetimes are fine); anything else goes through jsonable_encoder.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            return orjson.dumps(jsonable_encoder(content), option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by render_json."""
+
+    def render(self, content) -> bytes:
+        return render_json(content)
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match comparison (weak, as required for GET)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": REVALIDATE})
+
+
+def versioned_json(body: bytes, etag: str) -> Response:
+    """A JSON body already rendered (see render_json), with its validator."""
+    return Response(body, media_type="application/json", headers={"ETag": etag, "Cache-Control": REVALIDATE})
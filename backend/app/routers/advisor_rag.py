@@ -1,80 +1,146 @@
-from fastapi import APIRouter, Depends, HTTPException
+import json
+from typing import Literal
 
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+
+from ..services import advice as advice_service
+from ..services import advice_cache, advice_jobs
 from ..services import dashboard as dashboard_service
 from ..services.auth import get_current_user
-from ...rag_modules.pipeline import generate_financial_advice
+from ...rag_modules.admission import Overloaded
+from ...rag_modules.pipeline import (
+    PROMPT_VERSION,
+    aretrieve_context,
+    astream_financial_advice,
+    retrieval_admission,
+)
 
 
 router = APIRouter(tags=["Advisor"])
 
 
-@router.get("/financial-advice")
-async def get_financial_advice(user_email: str = Depends(get_current_user)):
-    """
-    Fetches all user expenses from the database, concatenates them,
-    and returns personalized financial advice.
-    """
-    try:
-        user_expenses = await dashboard_service.get_user_expenses(user_email)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching expenses: {e}")
-
-    if not user_expenses:
-        return {"advice": "No expense data found. Please add some expenses to get advice."}
-
-    expenses_summary_list = []
-    for expense in user_expenses:
-        expenses_summary_list.append(
-            f"Price: {expense.get('amount')}. Category: {expense.get('category')}. Description: {expense.get('description')}."
-        )
+def overloaded_error(e: Overloaded) -> HTTPException:
+    return HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
 
-    user_expenses_summary = " ".join(expenses_summary_list)
 
-    advice = generate_financial_advice(user_expenses_summary)
+def sse_event(data: dict, event: str = None) -> str:
+    """
+    Formats one Server-Sent Event; data is JSON so tokens may contain newlines.
+    """
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
 
-    return {"advice": advice}
 
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List, Dict
+async def stream_advice_events(user_email, user_expenses, user_expenses_summary):
+    """
+    Yields the advice as SSE `token` events followed by a final `done` event.
+    Cached advice, and advice generated for an identical request in flight,
+    is sent as a single token.
+    """
+    if not user_expenses_summary:
+        yield sse_event({"token": advice_service.NO_EXPENSES_ADVICE})
+        yield sse_event({}, event="done")
+        return
 
-# Import the new service function
-from ..services import dashboard as dashboard_service
-# Import your authentication dependency
-from ..services.auth import get_current_user
-# Import your RAG pipeline function (only what you actually use)
-from ...rag_modules.pipeline import generate_financial_advice, llm, db
+    flights = advice_service.flights
+    key = advice_service.flight_key("full", user_email, user_expenses)
+    try:
+        if flights.running(key) is not None:
+            yield sse_event({"token": await flights.join(key)})
+        else:
+            # As in advice.full_advice, only a cache miss takes an LLM slot
+            async with flights.lead(key) as flight:
+                context = await aretrieve_context(user_expenses_summary)
+                cached = await advice_cache.get_cached_advice(user_email, user_expenses, context, PROMPT_VERSION)
+                if cached is not None:
+                    flight.set_result(cached)
+                    yield sse_event({"token": cached})
+                else:
+                    tokens = []
+                    async for token in astream_financial_advice(user_expenses_summary, context=context):
+                        tokens.append(token)
+                        yield sse_event({"token": token})
+                    advice = "".join(tokens)
+                    await advice_cache.store_advice(user_email, user_expenses, context, PROMPT_VERSION, advice)
+                    flight.set_result(advice)
+    except Overloaded as e:
+        yield sse_event({"detail": str(e), "retry_after": e.retry_after}, event="error")
+        return
+    except Exception as e:
+        yield sse_event({"detail": f"Error generating advice: {e}"}, event="error")
+        return
+    yield sse_event({}, event="done")
 
-router = APIRouter()
 
 @router.get("/financial-advice")
-async def get_financial_advice(user_email: str = Depends(get_current_user)):
+async def get_financial_advice(
+    stream: bool = False,
+    mode: Literal["full", "incremental"] = "full",
+    user_email: str = Depends(get_current_user),
+):
     """
     Fetches all user expenses from the database, concatenates them,
     and returns personalized financial advice.
+    With `stream=true` the advice is sent as Server-Sent Events while it is generated.
+    With `mode=incremental` each expense item is analyzed once and memoized, so only
+    new items reach the LLM; the response also carries the total savings.
+    Identical requests in flight share one generation. Cached advice is served
+    even when the LLM is saturated; a request that needs the LLM while its
+    queue is full is refused with 429 (503 if it waited too long) and a
+    Retry-After header, or, when streaming, ends with an `error` event.
     """
-    # 1. Fetch all expense entries for the logged-in user.
     try:
         user_expenses = await dashboard_service.get_user_expenses(user_email)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching expenses: {e}")
-
-    if not user_expenses:
-        return {"advice": "No expense data found. Please add some expenses to get advice."}
-
-    # 2. Concatenate the expenses into a single, comprehensive string.
-    expenses_summary_list = []
-    for expense in user_expenses:
-        expenses_summary_list.append(
-            f"Price: {expense.get('amount')}. Category: {expense.get('category')}. Description: {expense.get('description')}."
+    user_expenses = advice_service.advice_expenses(mode, user_expenses)
+
+    # Shed a retrieval burst before the streamed 200 goes out; the LLM slot is only
+    # needed (and checked) on an advice cache miss, and joining a generation in flight needs neither
+    key = advice_service.flight_key(mode, user_email, user_expenses)
+    if user_expenses and advice_service.flights.running(key) is None:
+        try:
+            retrieval_admission.check()
+        except Overloaded as e:
+            raise overloaded_error(e)
+
+    if stream and mode == "full":
+        return StreamingResponse(
+            stream_advice_events(user_email, user_expenses, advice_service.build_expenses_summary(user_expenses)),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
         )
-    
-    # Join all the individual expense strings into one large string.
-    user_expenses_summary = " ".join(expenses_summary_list)
-    
-    # 3. Pass the concatenated string to the RAG pipeline.
-    advice = generate_financial_advice(user_expenses_summary, llm, db)
-    
-    # 4. Return only the advice.
-    return {
-        "advice": advice
-    }
+
+    # Retrieval and the LLM call are awaited, so other requests keep being served
+    try:
+        return await advice_service.generate_advice(user_email, user_expenses, mode)
+    except Overloaded as e:
+        raise overloaded_error(e)
+
+
+@router.post("/financial-advice/jobs", status_code=202)
+async def create_advice_job(
+    request: Request,
+    response: Response,
+    mode: Literal["full", "incremental"] = "full",
+    user_email: str = Depends(get_current_user),
+):
+    """
+    Enqueues advice generation and returns the job (with its `job_id`) at
+    once; poll GET /financial-advice/jobs/{job_id} until its status is
+    "done" (the advice is in `result`) or "failed". A job of the same mode
+    still queued for the user is returned instead of a new one.
+    """
+    job = await advice_jobs.submit(user_email, mode)
+    response.headers["Location"] = str(request.url_for("get_advice_job", job_id=job["job_id"]))
+    return job
+
+
+@router.get("/financial-advice/jobs/{job_id}")
+async def get_advice_job(job_id: str, user_email: str = Depends(get_current_user)):
+    """Status of an advice job: queued, running, done (with `result`) or failed (with `error`)."""
+    job = await advice_jobs.get_job(job_id, user_email)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Advice job not found")
+    return job
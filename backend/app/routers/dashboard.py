@@ -1,28 +1,162 @@
-from fastapi import APIRouter, Depends
-from fastapi.responses import JSONResponse
+from datetime import datetime
+from typing import Any, List, Literal, Optional
+
+from fastapi import APIRouter, Body, Depends, File, HTTPException, Query, Request, UploadFile
+from fastapi.responses import StreamingResponse
+from ..responses import FastJSONResponse, etag_matches, not_modified, versioned_json
 from ..services import dashboard as dashboard_service
+from ..services import summary_cache, versions
 from ..services.auth import get_current_user
-from ..schemas.dashboard import TrackerEntry, MonthlyIncome
+from ..schemas.dashboard import MONTH_PATTERN, TrackerEntry, MonthlyIncome
 
 router = APIRouter(tags=["Dashboard"])
 
+def current_month():
+    return datetime.today().strftime("%Y-%m")
+
+
+async def month_view(request: Request, view: str, user: str, month: str, compute, *variant):
+    """
+    Conditional, cached response for a per-month read: 304 when the client's
+    ETag is current, otherwise the cached or freshly computed body.
+    """
+    # Read the version before the data: a write in between only makes the tag stale
+    version = await versions.current(user, month)
+    etag = versions.etag(user, version, view, month, *variant)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    body = await summary_cache.get_or_render(view, user, month, version, compute, *variant)
+    return versioned_json(body, etag)
+
+
 @router.get("/tracker")
-async def get_tracker(month: str = None, user: str = Depends(get_current_user)):
-    return await dashboard_service.get_tracker_data(user, month)
+async def get_tracker(
+    request: Request,
+    month: Optional[str] = Query(None, pattern=MONTH_PATTERN),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(dashboard_service.TRACKER_PAGE_SIZE, ge=1, le=500),
+    user: str = Depends(get_current_user),
+):
+    month = month or current_month()
+    return await month_view(
+        request, "tracker", user, month,
+        lambda: dashboard_service.get_tracker_data(user, month, skip=skip, limit=limit), skip, limit,
+    )
+
+@router.get("/month")
+async def get_month(
+    request: Request,
+    month: Optional[str] = Query(None, pattern=MONTH_PATTERN),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(dashboard_service.TRACKER_PAGE_SIZE, ge=1, le=500),
+    user: str = Depends(get_current_user),
+):
+    """/tracker and /category-totals of a month in one response."""
+    month = month or current_month()
+    return await month_view(
+        request, "month", user, month,
+        lambda: dashboard_service.get_month(user, month, skip=skip, limit=limit), skip, limit,
+    )
 
 @router.post("/tracker/income")
 async def set_income(data: MonthlyIncome, user: str = Depends(get_current_user)):
-    await dashboard_service.set_monthly_income(user, data.amount, data.month)
-    return JSONResponse(content={"message": "Monthly income set successfully."})
+    result = await dashboard_service.set_monthly_income(user, data.amount, data.month)
+    return FastJSONResponse({"message": "Monthly income set successfully.", **result})
 
 @router.post("/tracker/entry")
 async def add_entry(data: TrackerEntry, user: str = Depends(get_current_user)):
-    await dashboard_service.add_tracker_entry(user, data.amount, data.type, data.category, data.description, data.date)
-    return JSONResponse(content={"message": "Entry added successfully."})
+    result = await dashboard_service.add_tracker_entry(
+        user, data.amount, data.type, data.category, data.description, data.date
+    )
+    return FastJSONResponse({"message": "Entry added successfully.", **result})
+
+def _check_import_size(rows: list):
+    if len(rows) > dashboard_service.MAX_IMPORT_ROWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {dashboard_service.MAX_IMPORT_ROWS} entries can be imported at once",
+        )
+
+
+@router.post("/tracker/entries/bulk")
+async def add_entries(rows: List[Any] = Body(...), user: str = Depends(get_current_user)):
+    _check_import_size(rows)
+    return await dashboard_service.import_entries(user, rows)
+
+
+@router.post("/tracker/entries/import")
+async def import_entries(file: UploadFile = File(...), user: str = Depends(get_current_user)):
+    try:
+        rows = dashboard_service.parse_import_file(file.filename, await file.read())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    _check_import_size(rows)
+    return await dashboard_service.import_entries(user, rows)
+
+@router.get("/summary")
+async def get_summary(
+    from_month: Optional[str] = Query(None, alias="from", pattern=MONTH_PATTERN),
+    to_month: Optional[str] = Query(None, alias="to", pattern=MONTH_PATTERN),
+    user: str = Depends(get_current_user),
+):
+    # Defaults to the twelve months ending with the current one
+    to_month = to_month or current_month()
+    if not from_month:
+        year, month = map(int, to_month.split("-"))
+        from_month = f"{year - 1}-{month + 1:02d}" if month < 12 else f"{year}-01"
+    try:
+        return await dashboard_service.get_summary(user, from_month, to_month)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/category-totals")  # Correct!
-async def get_category_totals(month: str = None, user: str = Depends(get_current_user)):
-    return await dashboard_service.get_category_totals(user, month)
+async def get_category_totals(
+    request: Request,
+    month: Optional[str] = Query(None, pattern=MONTH_PATTERN),
+    user: str = Depends(get_current_user),
+):
+    month = month or current_month()
+    return await month_view(
+        request, "category-totals", user, month, lambda: dashboard_service.get_category_totals(user, month)
+    )
+
+
+def entry_filters(
+    from_month: Optional[str] = Query(None, pattern=MONTH_PATTERN),
+    to_month: Optional[str] = Query(None, pattern=MONTH_PATTERN),
+    type: Optional[Literal["expense", "side-income"]] = None,
+    category: Optional[str] = None,
+):
+    return {"from_month": from_month, "to_month": to_month, "type_": type, "category": category}
+
 
+@router.get("/entries", response_class=FastJSONResponse)
+async def list_entries(
+    limit: int = Query(dashboard_service.TRACKER_PAGE_SIZE, ge=1, le=500),
+    cursor: Optional[str] = None,
+    filters: dict = Depends(entry_filters),
+    user: str = Depends(get_current_user),
+):
+    try:
+        return await dashboard_service.list_entries(user, limit=limit, cursor=cursor, **filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.get("/entries/export")
+async def export_entries(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    filters: dict = Depends(entry_filters),
+    user: str = Depends(get_current_user),
+):
+    if format == "csv":
+        rows = dashboard_service.export_entries_csv(user, **filters)
+        media_type = "text/csv"
+    else:
+        rows = dashboard_service.export_entries_ndjson(user, **filters)
+        media_type = "application/x-ndjson"
+    return StreamingResponse(
+        rows,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="entries.{format}"'},
+    )
@@ -1,6 +1,9 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, Literal
 
+# "YYYY-MM": months are stored and compared as strings, so they must sort in date order
+MONTH_PATTERN = r"^\d{4}-\d{2}$"
+
 class TrackerEntry(BaseModel):
     amount: float
     type: Literal["expense", "side-income"] 
@@ -10,4 +13,4 @@ class TrackerEntry(BaseModel):
 
 class MonthlyIncome(BaseModel):
     amount: float
-    month: str
\ No newline at end of file
+    month: str = Field(pattern=MONTH_PATTERN)
@@ -0,0 +1,82 @@
+"""
+Financial advice for a user's expenses, shared by the advisor endpoints and
+the background job workers (see advice_jobs). Identical requests in flight
+share one generation, and generated advice is cached (see advice_cache).
+"""
+import os
+
+from ...rag_modules.pipeline import (
+    PROMPT_VERSION,
+    agenerate_financial_advice,
+    agenerate_incremental_advice,
+    aretrieve_context,
+)
+from ...rag_modules.singleflight import SingleFlight
+from . import advice_cache
+
+# Full mode puts every expense in one prompt, so it only sees the newest ones;
+# incremental mode covers the whole history
+FULL_ADVICE_MAX_EXPENSES = int(os.getenv("FULL_ADVICE_MAX_EXPENSES", "1000"))
+
+NO_EXPENSES_ADVICE = "No expense data found. Please add some expenses to get advice."
+
+# Duplicate requests (double clicks, reloads, jobs) for the same user and expenses share one generation
+flights = SingleFlight("advice")
+
+
+def flight_key(mode: str, user_email: str, user_expenses):
+    return mode, user_email, advice_cache.expenses_fingerprint(user_expenses)
+
+
+def advice_expenses(mode: str, user_expenses):
+    """The expenses (newest first, as get_user_expenses returns them) a mode's advice is based on."""
+    return user_expenses if mode == "incremental" else user_expenses[:FULL_ADVICE_MAX_EXPENSES]
+
+
+def build_expenses_summary(user_expenses):
+    """
+    Concatenates the user's expenses into the summary string the RAG pipeline expects.
+    """
+    expenses_summary_list = []
+    for expense in user_expenses:
+        expenses_summary_list.append(
+            f"Price: {expense.get('amount')}. Category: {expense.get('category')}. Description: {expense.get('description')}."
+        )
+    return " ".join(expenses_summary_list)
+
+
+async def full_advice(user_email, user_expenses, user_expenses_summary):
+    """
+    Cached advice for the expenses, or a new generation stored in the cache.
+    Retrieval (the cache key needs the context) and the cache lookup take no
+    advice_admission slot, so cached advice is served while the LLM is busy;
+    only a miss waits for a slot or is rejected.
+    """
+    context = await aretrieve_context(user_expenses_summary)
+    advice = await advice_cache.get_cached_advice(user_email, user_expenses, context, PROMPT_VERSION)
+    if advice is None:
+        advice = await agenerate_financial_advice(user_expenses_summary, context=context)
+        await advice_cache.store_advice(user_email, user_expenses, context, PROMPT_VERSION, advice)
+    return advice
+
+
+async def generate_advice(user_email: str, user_expenses, mode: str = "full") -> dict:
+    """
+    {"advice": ...} for the expenses; incremental mode adds the total savings
+    and per-item counts. May raise rag_modules.admission.Overloaded.
+    """
+    user_expenses = advice_expenses(mode, user_expenses)
+    if mode == "incremental":
+        if not user_expenses:
+            return {"advice": NO_EXPENSES_ADVICE, "total_savings": 0.0}
+        return await flights.do(
+            flight_key(mode, user_email, user_expenses), lambda: agenerate_incremental_advice(user_expenses)
+        )
+
+    if not user_expenses:
+        return {"advice": NO_EXPENSES_ADVICE}
+    summary = build_expenses_summary(user_expenses)
+    advice = await flights.do(
+        flight_key(mode, user_email, user_expenses), lambda: full_advice(user_email, user_expenses, summary)
+    )
+    return {"advice": advice}
@@ -0,0 +1,60 @@
+import hashlib
+import json
+import os
+
+from .cache import create_cache
+
+# Optional shared store, e.g. redis://localhost:6379/0; in-memory per worker when unset
+ADVICE_CACHE_URL = os.getenv("ADVICE_CACHE_URL")
+ADVICE_CACHE_TTL_SECONDS = int(os.getenv("ADVICE_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+ADVICE_CACHE_MAX_ITEMS = int(os.getenv("ADVICE_CACHE_MAX_ITEMS", "2048"))
+
+_cache = create_cache(
+    ADVICE_CACHE_URL,
+    namespace="advice",
+    max_items=ADVICE_CACHE_MAX_ITEMS,
+    default_ttl=ADVICE_CACHE_TTL_SECONDS,
+)
+
+
+def _normalize_text(value) -> str:
+    return " ".join(str(value or "").split()).lower()
+
+
+def expenses_fingerprint(user_expenses) -> str:
+    """
+    Stable hash of the user's expense set: independent of document order,
+    ids, dates and whitespace/casing in category or description.
+    """
+    items = sorted(
+        (round(float(e.get("amount") or 0), 2), _normalize_text(e.get("category")), _normalize_text(e.get("description")))
+        for e in user_expenses
+    )
+    return hashlib.sha256(json.dumps(items).encode("utf-8")).hexdigest()
+
+
+async def _advice_key(user_email: str, user_expenses, context: str, prompt_version: str) -> str:
+    # The per-user generation is bumped on every new expense, dropping all older entries
+    generation = await _cache.get_counter(f"generation:{user_email}")
+    digest = hashlib.sha256(
+        "\x00".join([expenses_fingerprint(user_expenses), context, prompt_version]).encode("utf-8")
+    ).hexdigest()
+    return f"{user_email}:{generation}:{digest}"
+
+
+async def get_cached_advice(user_email: str, user_expenses, context: str, prompt_version: str):
+    """
+    Returns previously generated advice for this exact expense set, context and prompt, or None.
+    """
+    return await _cache.get(await _advice_key(user_email, user_expenses, context, prompt_version))
+
+
+async def store_advice(user_email: str, user_expenses, context: str, prompt_version: str, advice: str):
+    await _cache.set(await _advice_key(user_email, user_expenses, context, prompt_version), advice)
+
+
+async def invalidate_user(user_email: str):
+    """
+    Drops every cached advice for the user; called when they add an expense.
+    """
+    await _cache.incr(f"generation:{user_email}")
@@ -0,0 +1,374 @@
+"""
+Advice generated off the request path. POST /financial-advice/jobs enqueues a
+job and returns its id; GET /financial-advice/jobs/{id} reports its status
+and, once done, the advice. Worker tasks started with the app (start_workers)
+run the jobs, retrying failures with backoff up to ADVICE_JOB_MAX_ATTEMPTS.
+
+The queue is in-process by default (ADVICE_JOB_BROKER=memory): jobs live in
+the worker that accepted them. With ADVICE_JOB_BROKER=mongo the
+advice_jobs collection is the broker, so any API worker (or a dedicated
+one) can run a job and answer its polls; a job whose worker died is picked
+up again once its lease expires.
+
+Advice for users whose expenses changed can be refreshed off-peak, either by
+setting ADVICE_PRECOMPUTE_AT=HH:MM on one worker or from cron with:
+
+    python -m backend.app.services.advice_jobs [--since-hours 24]
+
+Out of process this only helps when the advice cache is shared (ADVICE_CACHE_URL).
+"""
+import argparse
+import asyncio
+import logging
+import os
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ReturnDocument
+
+from ...rag_modules.admission import Overloaded
+from ..database import get_database
+from . import advice, dashboard, versions
+
+logger = logging.getLogger(__name__)
+
+db = get_database()
+
+ADVICE_JOB_BROKER = os.getenv("ADVICE_JOB_BROKER", "memory")
+# Worker tasks per process; 0 only accepts jobs (another process runs them)
+ADVICE_JOB_WORKERS = int(os.getenv("ADVICE_JOB_WORKERS", "2"))
+ADVICE_JOB_MAX_ATTEMPTS = int(os.getenv("ADVICE_JOB_MAX_ATTEMPTS", "3"))
+ADVICE_JOB_RETRY_SECONDS = float(os.getenv("ADVICE_JOB_RETRY_SECONDS", "5"))
+# Finished jobs can be polled for this long
+ADVICE_JOB_TTL_SECONDS = int(os.getenv("ADVICE_JOB_TTL_SECONDS", str(60 * 60)))
+ADVICE_JOB_POLL_SECONDS = float(os.getenv("ADVICE_JOB_POLL_SECONDS", "1"))
+# A running job's lease is renewed every third of this, so it only lapses when its worker is gone
+ADVICE_JOB_LEASE_SECONDS = float(os.getenv("ADVICE_JOB_LEASE_SECONDS", "300"))
+# Longest pause of a worker after consecutive broker errors
+ADVICE_JOB_MAX_BACKOFF_SECONDS = float(os.getenv("ADVICE_JOB_MAX_BACKOFF_SECONDS", "60"))
+ADVICE_PRECOMPUTE_AT = os.getenv("ADVICE_PRECOMPUTE_AT")
+
+MAX_MEMORY_JOBS = 10000
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def new_job(user_email: str, mode: str):
+    now = _now()
+    return {
+        "_id": uuid.uuid4().hex,
+        "user": user_email,
+        "mode": mode,
+        "status": "queued",
+        "attempts": 0,
+        "created_at": now,
+        "updated_at": now,
+        "run_at": now,
+    }
+
+
+def public_job(job):
+    """The job as returned by the API."""
+    shown = {
+        "job_id": job["_id"],
+        "mode": job["mode"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+    for field in ("result", "error"):
+        if job.get(field) is not None:
+            shown[field] = job[field]
+    return shown
+
+
+class MemoryBroker:
+    """Jobs and queue of this process; the oldest finished jobs are dropped beyond MAX_MEMORY_JOBS."""
+
+    def __init__(self):
+        self.jobs: "OrderedDict[str, dict]" = OrderedDict()
+        self._queue = asyncio.Queue()
+
+    async def create(self, job):
+        self.jobs[job["_id"]] = job
+        while len(self.jobs) > MAX_MEMORY_JOBS:
+            oldest = next((j for j in self.jobs.values() if j["status"] in ("done", "failed")), None)
+            if oldest is None:
+                break
+            del self.jobs[oldest["_id"]]
+        self._queue.put_nowait(job["_id"])
+        return job
+
+    async def find_queued(self, user_email: str, mode: str):
+        for job in reversed(self.jobs.values()):
+            if job["user"] == user_email and job["mode"] == mode and job["status"] == "queued":
+                return job
+        return None
+
+    async def get(self, job_id: str):
+        return self.jobs.get(job_id)
+
+    async def claim(self):
+        while True:
+            job = self.jobs.get(await self._queue.get())
+            if job is not None and job["status"] == "queued":
+                job.update(status="running", attempts=job["attempts"] + 1, updated_at=_now())
+                return job
+
+    async def update(self, job, fields):
+        job.update(fields, updated_at=_now())
+        if fields.get("status") == "queued":
+            delay = max(0.0, (job["run_at"] - _now()).total_seconds())
+            asyncio.get_running_loop().call_later(delay, self._queue.put_nowait, job["_id"])
+
+    async def renew(self, job):
+        # Only this process runs its jobs, so there is no lease to extend
+        pass
+
+    def empty(self) -> bool:
+        return not any(job["status"] in ("queued", "running") for job in self.jobs.values())
+
+
+class MongoBroker:
+    """The advice_jobs collection as a queue shared by every process; workers poll it."""
+
+    async def create(self, job):
+        await db.advice_jobs.insert_one(job)
+        return job
+
+    async def find_queued(self, user_email: str, mode: str):
+        return await db.advice_jobs.find_one({"user": user_email, "mode": mode, "status": "queued"})
+
+    async def get(self, job_id: str):
+        return await db.advice_jobs.find_one({"_id": job_id})
+
+    async def claim(self):
+        while True:
+            now = _now()
+            job = await db.advice_jobs.find_one_and_update(
+                {"$or": [
+                    {"status": "queued", "run_at": {"$lte": now}},
+                    # Its worker stopped without finishing it
+                    {"status": "running", "lease_until": {"$lt": now}},
+                ]},
+                {
+                    "$set": {
+                        "status": "running",
+                        "updated_at": now,
+                        "lease_until": now + timedelta(seconds=ADVICE_JOB_LEASE_SECONDS),
+                    },
+                    "$inc": {"attempts": 1},
+                },
+                sort=[("run_at", 1)],
+                return_document=ReturnDocument.AFTER,
+            )
+            if job is not None:
+                return job
+            await asyncio.sleep(ADVICE_JOB_POLL_SECONDS)
+
+    async def update(self, job, fields):
+        fields = {**fields, "updated_at": _now()}
+        job.update(fields)
+        await db.advice_jobs.update_one({"_id": job["_id"]}, {"$set": fields})
+
+    async def renew(self, job):
+        """Extends the lease of a job this worker is still running."""
+        await db.advice_jobs.update_one(
+            {"_id": job["_id"], "status": "running"},
+            {"$set": {"lease_until": _now() + timedelta(seconds=ADVICE_JOB_LEASE_SECONDS)}},
+        )
+
+    def empty(self) -> bool:
+        return False
+
+
+broker = MongoBroker() if ADVICE_JOB_BROKER == "mongo" else MemoryBroker()
+
+
+async def submit(user_email: str, mode: str = "full"):
+    """
+    Enqueues an advice job, or returns the user's job for this mode that is
+    still queued (it reads the expenses only when it starts).
+    """
+    job = await broker.find_queued(user_email, mode)
+    if job is None:
+        job = await broker.create(new_job(user_email, mode))
+    return public_job(job)
+
+
+async def get_job(job_id: str, user_email: str):
+    """The job if it exists and belongs to the user, else None."""
+    job = await broker.get(job_id)
+    if job is None or job["user"] != user_email:
+        return None
+    return public_job(job)
+
+
+async def run_job(job):
+    user_expenses = await dashboard.get_user_expenses(job["user"])
+    return await advice.generate_advice(job["user"], user_expenses, job["mode"])
+
+
+async def _finish(job, result):
+    await broker.update(job, {
+        "status": "done",
+        "result": result,
+        "error": None,
+        "expires_at": _now() + timedelta(seconds=ADVICE_JOB_TTL_SECONDS),
+    })
+
+
+async def _retry_or_fail(job, error: str, delay: float, count_attempt: bool = True):
+    attempts = job["attempts"] if count_attempt else job["attempts"] - 1
+    if attempts >= ADVICE_JOB_MAX_ATTEMPTS:
+        logger.warning("Advice job %s failed after %d attempts: %s", job["_id"], attempts, error)
+        await broker.update(job, {
+            "status": "failed",
+            "attempts": attempts,
+            "error": error,
+            "expires_at": _now() + timedelta(seconds=ADVICE_JOB_TTL_SECONDS),
+        })
+    else:
+        await broker.update(job, {
+            "status": "queued",
+            "attempts": attempts,
+            "error": error,
+            "run_at": _now() + timedelta(seconds=delay),
+        })
+
+
+async def _keep_leased(job):
+    """Renews the job's lease until cancelled, so no other worker takes over a long generation."""
+    while True:
+        await asyncio.sleep(ADVICE_JOB_LEASE_SECONDS / 3)
+        try:
+            await broker.renew(job)
+        except Exception as e:
+            logger.warning("Could not renew the lease of advice job %s: %s", job["_id"], e)
+
+
+async def work_one():
+    """Claims one job and runs it, recording the outcome in the broker."""
+    job = await broker.claim()
+    lease = asyncio.create_task(_keep_leased(job))
+    try:
+        result = await run_job(job)
+    except asyncio.CancelledError:
+        # Shutting down: leave the job to be picked up again
+        try:
+            await broker.update(job, {"status": "queued", "attempts": job["attempts"] - 1, "run_at": _now()})
+        except Exception as e:
+            logger.warning("Could not requeue advice job %s: %s", job["_id"], e)
+        raise
+    except Overloaded as e:
+        # The LLM is busy with interactive requests; that is not the job's fault
+        await _retry_or_fail(job, str(e), e.retry_after, count_attempt=False)
+    except Exception as e:
+        delay = ADVICE_JOB_RETRY_SECONDS * 2 ** (job["attempts"] - 1)
+        await _retry_or_fail(job, f"Error generating advice: {e}", delay)
+    else:
+        await _finish(job, result)
+    finally:
+        lease.cancel()
+
+
+async def work():
+    """
+    Runs jobs from the broker until cancelled. A broker error (e.g. MongoDB
+    unreachable) is logged and the worker backs off and carries on; a job
+    whose outcome could not be recorded is picked up again once its lease
+    expires (MongoBroker).
+    """
+    failures = 0
+    while True:
+        try:
+            await work_one()
+            failures = 0
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            delay = min(ADVICE_JOB_RETRY_SECONDS * 2 ** failures, ADVICE_JOB_MAX_BACKOFF_SECONDS)
+            failures += 1
+            logger.exception("Advice job worker error, retrying in %.0fs", delay)
+            await asyncio.sleep(delay)
+
+
+async def changed_users(since: datetime):
+    """Users whose entries changed since `since` (per month_versions; income changes do not count)."""
+    return await db.month_versions.distinct(
+        "user", {"updated_at": {"$gte": since}, "month": {"$ne": versions.ALL_MONTHS}}
+    )
+
+
+async def enqueue_changed(since: datetime) -> int:
+    users = await changed_users(since)
+    for user_email in users:
+        await submit(user_email, "full")
+    return len(users)
+
+
+def _next_run(at: str, now: datetime) -> datetime:
+    hour, minute = map(int, at.split(":"))
+    run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    return run if run > now else run + timedelta(days=1)
+
+
+async def precompute_daily(at: str):
+    """Every day at `at` (HH:MM, UTC), enqueues advice for users whose expenses changed since the last run."""
+    since = _now() - timedelta(days=1)
+    while True:
+        now = _now()
+        await asyncio.sleep((_next_run(at, now) - now).total_seconds())
+        started = _now()
+        try:
+            count = await enqueue_changed(since)
+            logger.info("Advice precompute: enqueued %d users", count)
+            since = started
+        except Exception as e:
+            logger.warning("Advice precompute failed: %s", e)
+
+
+_tasks = []
+
+
+def start_workers(precompute: bool = True):
+    """Starts the job workers (and the daily precompute, if configured) on the running loop."""
+    loop = asyncio.get_running_loop()
+    _tasks.extend(loop.create_task(work()) for _ in range(ADVICE_JOB_WORKERS))
+    if precompute and ADVICE_PRECOMPUTE_AT:
+        _tasks.append(loop.create_task(precompute_daily(ADVICE_PRECOMPUTE_AT)))
+
+
+async def stop_workers():
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+
+
+async def _main(args):
+    count = await enqueue_changed(_now() - timedelta(hours=args.since_hours))
+    print(f"Enqueued advice for {count} users.")
+    if isinstance(broker, MemoryBroker):
+        # No other process can see this queue, so run it here
+        start_workers(precompute=False)
+        while not broker.empty():
+            await asyncio.sleep(ADVICE_JOB_POLL_SECONDS)
+        await stop_workers()
+        failed = sum(job["status"] == "failed" for job in broker.jobs.values())
+        print(f"Generated advice for {count - failed} users, {failed} failed.")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh advice for users whose expenses changed.")
+    parser.add_argument("--since-hours", type=float, default=24, help="look back this far for changes")
+    return asyncio.run(_main(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,23 +1,45 @@
+import asyncio
+import functools
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
-from fastapi import HTTPException, status, Depends
+from fastapi import HTTPException, Request, status, Depends
 from motor.motor_asyncio import AsyncIOMotorDatabase
 from passlib.context import CryptContext
+from pymongo.errors import DuplicateKeyError
 from jose import JWTError, jwt
 from fastapi.security import OAuth2PasswordBearer
 
 from ..schemas import user as user_schemas
 from ..database import get_database
+from ..metrics import span
+from .cache import MemoryCache
 
-# 🔐 Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+logger = logging.getLogger(__name__)
+
+# 🔐 Password hashing context; stored hashes with another cost are upgraded on login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# bcrypt releases the GIL, so a small thread pool keeps hashing off the event loop
+# and also caps how many CPU-heavy hashes run at once
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
 
 # 🔑 JWT Configuration
 SECRET_KEY = "your-secret-key"  # Replace this with a secure key in production
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# Verified tokens -> user email, each dropped at its exp; per worker
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+TOKEN_CACHE_MAX_TTL = ACCESS_TOKEN_EXPIRE_MINUTES * 60
+_token_cache = MemoryCache(max_items=TOKEN_CACHE_SIZE)
+
 # 🛡️ OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/user/token")
 
@@ -36,40 +58,56 @@ def get_password_hash(password):
     return pwd_context.hash(password)
 
 
-async def register_user(db: AsyncIOMotorDatabase, user_in: user_schemas.UserCreate):
+async def run_password_op(fn, *args):
     """
-    Registers a new user in the database. Checks for unique email/username.
+    Runs a bcrypt operation on the password hashing pool and awaits its result.
     """
-    # Check for existing email OR username
-    existing_user = await db.users.find_one({
-        "$or": [{"email": user_in.email}, {"username": user_in.username}]
-    })
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="Email or username already registered"
-        )
+    loop = asyncio.get_running_loop()
+    with span("hash"):
+        return await loop.run_in_executor(_hash_executor, functools.partial(fn, *args))
+
 
+async def register_user(db: AsyncIOMotorDatabase, user_in: user_schemas.UserCreate):
+    """
+    Registers a new user in the database. Email and username uniqueness is
+    enforced by the unique indexes on users (see app/indexes.py).
+    """
     # Hash password and insert user
-    hashed_password = get_password_hash(user_in.password)
+    hashed_password = await run_password_op(get_password_hash, user_in.password)
     user_data = user_in.model_dump()
     user_data["password"] = hashed_password
 
-    new_user = await db.users.insert_one(user_data)
-    created_user = await db.users.find_one({"_id": new_user.inserted_id})
+    try:
+        with span("db"):
+            new_user = await db.users.insert_one(user_data)
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Email or username already registered"
+        )
+    user_data["_id"] = new_user.inserted_id
 
-    return user_schemas.UserOut(**created_user)
+    return user_schemas.UserOut(**user_data)
 
 
 async def authenticate_user(db: AsyncIOMotorDatabase, identifier: str, password: str):
     """
     Authenticates user using either email or username.
+    A hash made with outdated settings (e.g. a lower BCRYPT_ROUNDS) is replaced.
     """
-    user = await db.users.find_one({
-        "$or": [{"email": identifier}, {"username": identifier}]
-    })
-    if not user or not verify_password(password, user["password"]):
+    with span("db"):
+        user = await db.users.find_one({
+            "$or": [{"email": identifier}, {"username": identifier}]
+        })
+    if not user:
+        return False
+    valid, new_hash = await run_password_op(pwd_context.verify_and_update, password, user["password"])
+    if not valid:
         return False
+    if new_hash:
+        with span("db"):
+            await db.users.update_one({"_id": user["_id"]}, {"$set": {"password": new_hash}})
+        user["password"] = new_hash
     return user
 
 
@@ -87,20 +125,37 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
-async def get_current_user(token: str = Depends(oauth2_scheme)) -> str:
+async def get_current_user(request: Request, token: str = Depends(oauth2_scheme)) -> str:
+    """
+    Resolves the user email for a bearer token. Verified tokens are cached until
+    their `exp`, so a warm token costs one dictionary lookup. The result is
+    also kept on request.state.user for the rest of the request.
+    """
+    user_email = getattr(request.state, "user", None)
+    if user_email is not None:
+        return user_email
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    user_email = await _token_cache.get(token)
+    if user_email is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError as e:
+            logger.debug("Rejected token: %s", e)
+            raise credentials_exception
         user_email = payload.get("sub")
-        print(f"🔍 JWT payload: {payload}")  # Debug line
-        print(f"🔍 Extracted user_email: {user_email}")  # Debug line
         if user_email is None:
+            logger.debug("Rejected token without subject")
             raise credentials_exception
-        return user_email
-    except JWTError as e:
-        print(f"🔍 JWT Error: {e}")  # Debug line
-        raise credentials_exception
\ No newline at end of file
+        # jwt.decode has checked exp, so the token stays valid for exp - now seconds
+        ttl = payload["exp"] - time.time() if "exp" in payload else TOKEN_CACHE_MAX_TTL
+        if ttl > 0:
+            await _token_cache.set(token, user_email, ttl=min(ttl, TOKEN_CACHE_MAX_TTL))
+        logger.debug("Verified token for %s", user_email)
+
+    request.state.user = user_email
+    return user_email
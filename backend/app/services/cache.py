@@ -0,0 +1,124 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+
+class MemoryCache:
+    """
+    In-process cache backend: size-bounded LRU with per-key TTL.
+    With `sizeof` (a function of the value, e.g. len for str/bytes values) the
+    LRU is also bounded to `max_bytes` in total, tracked in `bytes`.
+    Counters (see `incr`) are kept apart from the LRU so they are never evicted.
+    """
+
+    def __init__(
+        self,
+        max_items: int = 1024,
+        default_ttl: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[Any], int]] = None,
+    ):
+        self.max_items = max_items
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.bytes = 0
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()
+        self._counters = {}
+
+    def _size(self, value) -> int:
+        return self.sizeof(value) if self.sizeof else 0
+
+    def _pop(self, key: str):
+        value, _ = self._items.pop(key)
+        self.bytes -= self._size(value)
+
+    async def get(self, key: str) -> Any:
+        item = self._items.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._pop(key)
+            return None
+        self._items.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = ttl if ttl is not None else self.default_ttl
+        expires_at = time.monotonic() + ttl if ttl else None
+        if key in self._items:
+            self._pop(key)
+        self._items[key] = (value, expires_at)
+        self.bytes += self._size(value)
+        while len(self._items) > self.max_items or (self.max_bytes is not None and self.bytes > self.max_bytes):
+            self._pop(next(iter(self._items)))
+
+    async def delete(self, key: str):
+        if key in self._items:
+            self._pop(key)
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+    async def get_counter(self, key: str) -> int:
+        return self._counters.get(key, 0)
+
+    def __len__(self):
+        return len(self._items)
+
+
+class RedisCache:
+    """
+    Redis-compatible cache backend shared by all workers. Values are stored as JSON;
+    eviction beyond the TTL is left to the server's maxmemory policy.
+    """
+
+    def __init__(self, url: str, namespace: str, default_ttl: Optional[float] = None):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("The 'redis' package is required for a redis:// cache URL.") from e
+        self._client = redis.from_url(url)
+        self.namespace = namespace
+        self.default_ttl = default_ttl
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def get(self, key: str) -> Any:
+        raw = await self._client.get(self._key(key))
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        ttl = ttl if ttl is not None else self.default_ttl
+        await self._client.set(self._key(key), json.dumps(value), ex=int(ttl) if ttl else None)
+
+    async def delete(self, key: str):
+        await self._client.delete(self._key(key))
+
+    async def incr(self, key: str) -> int:
+        return await self._client.incr(self._key(key))
+
+    async def get_counter(self, key: str) -> int:
+        raw = await self._client.get(self._key(key))
+        return int(raw) if raw is not None else 0
+
+
+def create_cache(
+    url: Optional[str],
+    namespace: str,
+    max_items: int = 1024,
+    default_ttl: Optional[float] = None,
+    max_bytes: Optional[int] = None,
+    sizeof: Optional[Callable[[Any], int]] = None,
+):
+    """
+    Returns a RedisCache for redis:// (or rediss://) URLs, otherwise an in-memory cache.
+    The size bounds only apply in memory; a shared store manages its own.
+    """
+    if url and url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCache(url, namespace=namespace, default_ttl=default_ttl)
+    return MemoryCache(max_items=max_items, default_ttl=default_ttl, max_bytes=max_bytes, sizeof=sizeof)
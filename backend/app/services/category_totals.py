@@ -0,0 +1,208 @@
+"""
+category_totals is a materialized view of expense entries: one document per
+(user, month, category) holding the sum of that category's expense amounts.
+
+Writes go through write_entries, which inserts the entries and applies their
+increments (and those of monthly_rollups) in one transaction when the
+deployment supports it (replica set or sharded cluster). On a standalone
+server the writes are sequential, and reconcile() recomputes the view from
+entries, reports drift and repairs it:
+
+    python -m backend.app.services.category_totals [--user EMAIL] [--from-month 2025-01] [--to-month 2025-03] [--dry-run]
+"""
+import argparse
+import asyncio
+import logging
+from collections import defaultdict
+
+from pymongo import DeleteOne, ReturnDocument, UpdateOne
+from pymongo.errors import PyMongoError
+
+from ..database import get_database
+from ..metrics import span
+from . import rollups, versions
+
+logger = logging.getLogger(__name__)
+
+db = get_database()
+
+# Totals closer than this to the recomputed value are not reported as drift
+DRIFT_TOLERANCE = 0.005
+
+# None until the first write probes the deployment
+_transactions_supported = None
+
+
+def expense_increments(entries):
+    """Sum of expense amounts per (user, month, category)."""
+    increments = defaultdict(float)
+    for entry in entries:
+        if entry["type"] == "expense":
+            increments[(entry["user"], entry["month"], entry["category"])] += entry["amount"]
+    return increments
+
+
+async def supports_transactions() -> bool:
+    global _transactions_supported
+    if _transactions_supported is None:
+        try:
+            hello = await db.client.admin.command("hello")
+            _transactions_supported = "setName" in hello or hello.get("msg") == "isdbgrid"
+        except PyMongoError:
+            _transactions_supported = False
+        if not _transactions_supported:
+            logger.warning("MongoDB transactions unavailable; category_totals relies on reconcile() for repair")
+    return _transactions_supported
+
+
+async def _write(entries, increments, session=None):
+    if len(entries) == 1:
+        await db.entries.insert_one(entries[0], session=session)
+    else:
+        await db.entries.insert_many(entries, ordered=False, session=session)
+    if increments:
+        await db.category_totals.bulk_write(
+            [
+                UpdateOne({"user": user, "month": month, "category": category}, {"$inc": {"total": total}}, upsert=True)
+                for (user, month, category), total in increments.items()
+            ],
+            ordered=False,
+            session=session,
+        )
+    month_increments = rollups.rollup_increments(entries)
+    await db.monthly_rollups.bulk_write(rollups.rollup_operations(month_increments), ordered=False, session=session)
+    await versions.bump(month_increments, session=session)
+
+
+async def _write_one(entry, session=None):
+    await db.entries.insert_one(entry, session=session)
+    user, month = entry["user"], entry["month"]
+    category_total = None
+    if entry["type"] == "expense":
+        category_total = await db.category_totals.find_one_and_update(
+            {"user": user, "month": month, "category": entry["category"]},
+            {"$inc": {"total": entry["amount"]}},
+            projection={"_id": 0, "category": 1, "total": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+            session=session,
+        )
+    rollup = await db.monthly_rollups.find_one_and_update(
+        {"user": user, "month": month},
+        {"$inc": rollups.rollup_increments([entry])[(user, month)]},
+        projection={"_id": 0},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+        session=session,
+    )
+    await versions.bump([(user, month)], session=session)
+    return rollup, category_total
+
+
+async def write_entry(entry):
+    """
+    write_entries for a single entry, returning the documents its increments
+    produced: the month's monthly_rollups document and, for an expense, its
+    category_totals document ({"category", "total"}; None otherwise).
+    """
+    with span("db"):
+        if await supports_transactions():
+            async with await db.client.start_session() as session:
+                return await session.with_transaction(lambda s: _write_one(entry, session=s))
+        return await _write_one(entry)
+
+
+async def write_entries(entries):
+    """
+    Inserts entry documents, applies their category_totals and
+    monthly_rollups increments and bumps the version of every month touched,
+    atomically when transactions are available.
+    Returns the category_totals increments applied (empty if no expenses).
+    """
+    if not entries:
+        return {}
+    increments = expense_increments(entries)
+
+    with span("db"):
+        if await supports_transactions():
+            async with await db.client.start_session() as session:
+                await session.with_transaction(lambda s: _write(entries, increments, session=s))
+        else:
+            await _write(entries, increments)
+    return increments
+
+
+async def reconcile(user_email: str = None, from_month: str = None, to_month: str = None, fix: bool = True):
+    """
+    Recomputes totals from entries for the given user (all users if None) and
+    month range, compares them with the stored view and, unless fix=False,
+    upserts wrong or missing totals and deletes totals with no expenses left.
+
+    Entries written while this runs may be counted twice or not at all, so run
+    it when traffic is quiet (or run it again) if writes are not transactional.
+    """
+    match = {"type": "expense"}
+    view_filter = {}
+    if user_email:
+        match["user"] = view_filter["user"] = user_email
+    month_range = rollups.month_range(from_month, to_month)
+    if month_range:
+        match["month"] = view_filter["month"] = month_range
+
+    expected = {}
+    async for row in db.entries.aggregate([
+        {"$match": match},
+        {"$group": {"_id": {"user": "$user", "month": "$month", "category": "$category"}, "total": {"$sum": "$amount"}}},
+    ]):
+        key = (row["_id"]["user"], row["_id"]["month"], row["_id"]["category"])
+        expected[key] = float(row["total"])
+
+    stored = {}
+    async for doc in db.category_totals.find(view_filter, {"user": 1, "month": 1, "category": 1, "total": 1}):
+        stored[(doc["user"], doc["month"], doc["category"])] = float(doc.get("total") or 0)
+
+    drift, operations = [], []
+    for key in sorted(set(expected) | set(stored)):
+        want, have = expected.get(key, 0.0), stored.get(key)
+        if have is not None and abs(want - have) <= DRIFT_TOLERANCE:
+            continue
+        user, month, category = key
+        drift.append({
+            "user": user,
+            "month": month,
+            "category": category,
+            "expected": round(want, 2),
+            "stored": None if have is None else round(have, 2),
+        })
+        selector = {"user": user, "month": month, "category": category}
+        if key in expected:
+            operations.append(UpdateOne(selector, {"$set": {"total": want}}, upsert=True))
+        else:
+            operations.append(DeleteOne(selector))
+
+    if fix and operations:
+        await db.category_totals.bulk_write(operations, ordered=False)
+        await versions.bump((row["user"], row["month"]) for row in drift)
+    return {"checked": len(set(expected) | set(stored)), "drift": drift, "fixed": bool(fix and operations)}
+
+
+async def _main(args):
+    report = await reconcile(args.user, args.from_month, args.to_month, fix=not args.dry_run)
+    for row in report["drift"]:
+        print(f"{row['user']} {row['month']} {row['category']}: stored={row['stored']} expected={row['expected']}")
+    action = "repaired" if report["fixed"] else "found"
+    print(f"Checked {report['checked']} totals, {action} {len(report['drift'])} drifted.")
+    return 1 if report["drift"] and args.dry_run else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recompute category_totals from entries and repair drift.")
+    parser.add_argument("--user", help="only this user's totals (default: all users)")
+    parser.add_argument("--from-month", help="first month, YYYY-MM")
+    parser.add_argument("--to-month", help="last month, YYYY-MM")
+    parser.add_argument("--dry-run", action="store_true", help="report drift without repairing it")
+    return asyncio.run(_main(parser.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,109 +1,404 @@
+import asyncio
+import base64
+import bisect
+import csv
+import io
+import json
 from datetime import datetime
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pydantic import ValidationError
 from ..database import get_database
+from ..metrics import span
+from ..schemas.dashboard import TrackerEntry
+from . import advice_cache, category_totals, versions
 
 db = get_database()
 
-def get_effective_salary(income_docs, target_month_str):
-    target_month = datetime.strptime(target_month_str, "%Y-%m")
-    applicable_docs = []
+# Entries returned per /tracker page; totals always cover the whole month
+TRACKER_PAGE_SIZE = 100
+# Documents fetched per round trip when streaming an export
+EXPORT_BATCH_SIZE = 500
+EXPORT_FIELDS = ["_id", "date", "month", "type", "category", "description", "amount"]
+# Largest batch accepted by the bulk import endpoints
+MAX_IMPORT_ROWS = 10000
+# Longest range served by /summary
+MAX_SUMMARY_MONTHS = 120
 
-    for doc in income_docs:
-        try:
-            doc_month = datetime.strptime(doc["effective_month"], "%Y-%m")
-            if doc_month <= target_month:
-                applicable_docs.append((doc_month, float(doc["amount"])))
-        except:
-            continue
 
-    if not applicable_docs:
+async def get_effective_salary(user_email: str, target_month_str: str) -> float:
+    """
+    Salary in effect for a month: the latest income set at or before it.
+    "YYYY-MM" strings sort chronologically, so this is one indexed find_one.
+    """
+    doc = await db.income.find_one(
+        {"user": user_email, "effective_month": {"$lte": target_month_str}},
+        sort=[("effective_month", -1)],
+    )
+    try:
+        return float(doc["amount"]) if doc else 0.0
+    except (TypeError, ValueError):
         return 0.0
 
-    applicable_docs.sort(reverse=True)
-    return applicable_docs[0][1]
+class SalarySchedule:
+    """
+    A user's income settings sorted by effective month, so the salary in
+    effect for any month is a bisect instead of a scan over every setting.
+    """
+
+    def __init__(self, income_docs):
+        settings = []
+        for doc in income_docs:
+            try:
+                settings.append((str(doc["effective_month"]), float(doc["amount"])))
+            except (KeyError, TypeError, ValueError):
+                continue
+        settings.sort()
+        self.months = [month for month, _ in settings]
+        self.amounts = [amount for _, amount in settings]
+
+    def salary_for(self, month: str) -> float:
+        position = bisect.bisect_right(self.months, month)
+        return self.amounts[position - 1] if position else 0.0
+
+
+def month_totals(month: str, monthly_income: float, side_income: float, expense: float):
+    """The totals the dashboard shows for a month, rounded for display."""
+    total_income = monthly_income + side_income
+    return {
+        "month": month,
+        "monthly_income": round(monthly_income, 2),
+        "side_income": round(side_income, 2),
+        "total_expense": round(expense, 2),
+        "net_savings": round(total_income - expense, 2),
+        "total_income": round(total_income, 2),
+    }
+
+
+def rollup_totals(month: str, monthly_income: float, rollup):
+    rollup = rollup or {}
+    return month_totals(
+        month, monthly_income, float(rollup.get("side_income") or 0), float(rollup.get("expense") or 0)
+    )
+
 
 # 🔁 Utility function to convert Mongo ObjectId to string
 def serialize_doc(doc):
     doc["_id"] = str(doc["_id"])
     return doc
 
-async def get_tracker_data(user_email: str, month: str = None):
+def tracker_pipeline(user_email: str, month: str, skip: int = 0, limit: int = TRACKER_PAGE_SIZE):
+    """
+    One aggregation for the month: per-type totals and daily expense sums over
+    every entry, plus a single page of the entries themselves (newest first).
+    """
+    return [
+        {"$match": {"user": user_email, "month": month}},
+        {"$facet": {
+            "totals": [
+                {"$group": {"_id": "$type", "total": {"$sum": "$amount"}, "count": {"$sum": 1}}},
+            ],
+            "daily_expenses": [
+                {"$match": {"type": "expense"}},
+                {"$group": {"_id": "$date", "total": {"$sum": "$amount"}}},
+                {"$sort": {"_id": 1}},
+            ],
+            "entries": [
+                {"$sort": {"date": -1, "_id": -1}},
+                {"$skip": skip},
+                {"$limit": limit},
+            ],
+        }},
+    ]
+
+
+async def get_tracker_data(user_email: str, month: str = None, skip: int = 0, limit: int = TRACKER_PAGE_SIZE):
     if not month:
         month = datetime.today().strftime("%Y-%m")
 
-    # Get entries and income data
-    entries = await db.entries.find({"user": user_email, "month": month}).to_list(length=100)
-    income_docs = await db.income.find({"user": user_email}).to_list(length=100)
-
-    # Serialize ObjectId
-    entries = [serialize_doc(e) for e in entries]
-    income_docs = [serialize_doc(i) for i in income_docs]
+    with span("db"):
+        facets, monthly_income = await asyncio.gather(
+            db.entries.aggregate(tracker_pipeline(user_email, month, skip, limit)).to_list(length=1),
+            get_effective_salary(user_email, month),
+        )
+    facets = facets[0] if facets else {"totals": [], "daily_expenses": [], "entries": []}
 
-    # Calculate metrics
-    monthly_income = get_effective_salary(income_docs, month)
-    side_income_total = sum(float(e["amount"]) for e in entries if e["type"] == "side-income")
-    expense_total = sum(float(e["amount"]) for e in entries if e["type"] == "expense")
-    total_income = monthly_income + side_income_total
-    net_savings = total_income - expense_total
+    totals = {t["_id"]: t for t in facets["totals"]}
+    side_income_total = float(totals.get("side-income", {}).get("total", 0))
+    expense_total = float(totals.get("expense", {}).get("total", 0))
     return {
-    "entries": entries,
-    "month": month,
-    "monthly_income": round(monthly_income, 2),
-    "side_income": round(side_income_total, 2),
-    "total_expense": round(expense_total, 2),
-    "net_savings": round(net_savings, 2),
-    "total_income": round(total_income, 2),
+    "entries": [serialize_doc(e) for e in facets["entries"]],
+    "entries_total": sum(t["count"] for t in facets["totals"]),
+    "skip": skip,
+    "limit": limit,
+    "daily_expenses": [{"date": d["_id"], "total": round(float(d["total"]), 2)} for d in facets["daily_expenses"]],
+    **month_totals(month, monthly_income, side_income_total, expense_total),
 }
 
 async def set_monthly_income(user_email: str, amount: float, month: str):
-    await db.income.update_one(
-        {"user": user_email, "effective_month": month},
-        {"$set": {"amount": amount}},
-        upsert=True
-    )
+    """Sets the income effective from `month`; returns that month's updated totals."""
+    with span("db"):
+        income, rollup = await asyncio.gather(
+            db.income.find_one_and_update(
+                {"user": user_email, "effective_month": month},
+                {"$set": {"amount": amount}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            ),
+            db.monthly_rollups.find_one({"user": user_email, "month": month}, {"_id": 0}),
+        )
+        # Changes every month from `month` until the next income, so bump them all
+        await versions.bump([(user_email, versions.ALL_MONTHS)])
+    return {"totals": rollup_totals(month, float(income["amount"]), rollup)}
 
-async def add_tracker_entry(user_email: str, amount: float, type_: str, category: str, description: str, date: str = None):
+def build_entry(user_email: str, amount: float, type_: str, category: str, description: str, date: str = None):
     entry_date = datetime.strptime(date, "%Y-%m-%d") if date else datetime.today()
-    month = entry_date.strftime("%Y-%m")
-
-    await db.entries.insert_one({
+    return {
         "user": user_email,
-        "month": month,
+        "month": entry_date.strftime("%Y-%m"),
         "date": entry_date.strftime("%Y-%m-%d"),
         "type": type_,
         "amount": amount,
         "category": category,
         "description": description
-    })
-
-    # ✅ Only track category totals for "expense" type
-    if type_ == "expense":
-        await db.category_totals.update_one(
-            {"user": user_email, "month": month, "category": category},
-            {"$inc": {"total": amount}},
-            upsert=True
+    }
+
+
+async def add_tracker_entry(user_email: str, amount: float, type_: str, category: str, description: str, date: str = None):
+    """
+    Stores an entry and returns it with its month's updated totals and, for
+    an expense, its category's updated total, so clients need not refetch.
+    """
+    entry = build_entry(user_email, amount, type_, category, description, date)
+
+    # ✅ Only "expense" entries feed category totals; both writes go together
+    (rollup, category_total), monthly_income = await asyncio.gather(
+        category_totals.write_entry(entry),
+        get_effective_salary(user_email, entry["month"]),
+    )
+    if category_total is not None:
+        # A new expense changes the advice input, so cached advice is stale
+        await advice_cache.invalidate_user(user_email)
+        category_total["total"] = round(float(category_total["total"]), 2)
+
+    return {
+        "entry": serialize_doc(entry),
+        "totals": rollup_totals(entry["month"], monthly_income, rollup),
+        "category_total": category_total,
+    }
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in e['loc'])}: {e['msg']}" for e in error.errors())
+
+
+async def import_entries(user_email: str, rows: list):
+    """
+    Validates rows with the TrackerEntry schema and stores the valid ones in
+    two writes: one insert_many for the entries and one bulk_write of $inc
+    upserts, pre-aggregated per (month, category), for category_totals.
+    Invalid rows are skipped and reported by their 1-based position.
+    """
+    entries, errors = [], []
+
+    for number, row in enumerate(rows, start=1):
+        try:
+            if not isinstance(row, dict):
+                raise ValueError("row must be an object")
+            # csv.DictReader puts cells beyond the header under a None key
+            if None in row:
+                raise ValueError("row has more cells than the header")
+            # Blank cells (e.g. from CSV) mean "not given"
+            data = TrackerEntry(**{**row, "date": row.get("date") or None})
+            entry = build_entry(user_email, data.amount, data.type, data.category, data.description, data.date)
+        except ValidationError as e:
+            errors.append({"row": number, "error": _validation_message(e)})
+            continue
+        except ValueError as e:
+            errors.append({"row": number, "error": str(e)})
+            continue
+        entries.append(entry)
+
+    if await category_totals.write_entries(entries):
+        await advice_cache.invalidate_user(user_email)
+
+    return {"rows": len(rows), "inserted": len(entries), "errors": errors}
+
+
+def parse_import_file(filename: str, content: bytes) -> list:
+    """Rows of an uploaded CSV (header row) or JSON array file; ValueError if unreadable."""
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ValueError("File must be UTF-8 encoded")
+
+    if (filename or "").lower().endswith(".json") or text.lstrip().startswith("["):
+        try:
+            rows = json.loads(text)
+        except ValueError as e:
+            raise ValueError(f"Invalid JSON: {e}")
+        if not isinstance(rows, list):
+            raise ValueError("JSON file must contain an array of entries")
+        return rows
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+def month_span(from_month: str, to_month: str):
+    """Every "YYYY-MM" from from_month to to_month inclusive; ValueError if the range is invalid."""
+    start = datetime.strptime(from_month, "%Y-%m")
+    end = datetime.strptime(to_month, "%Y-%m")
+    count = (end.year - start.year) * 12 + end.month - start.month + 1
+    if count < 1:
+        raise ValueError("'from' must not be after 'to'")
+    if count > MAX_SUMMARY_MONTHS:
+        raise ValueError(f"At most {MAX_SUMMARY_MONTHS} months can be requested at once")
+    return [
+        f"{start.year + (start.month - 1 + i) // 12}-{(start.month - 1 + i) % 12 + 1:02d}"
+        for i in range(count)
+    ]
+
+
+async def get_summary(user_email: str, from_month: str, to_month: str):
+    """
+    Income, side income, expenses, net savings and category breakdown for
+    every month of a range, from three concurrent indexed queries: the
+    monthly rollups, category_totals and the user's income settings.
+    """
+    months = month_span(from_month, to_month)
+    month_filter = {"user": user_email, "month": {"$gte": from_month, "$lte": to_month}}
+    with span("db"):
+        rollup_docs, category_docs, income_docs = await asyncio.gather(
+            db.monthly_rollups.find(month_filter).to_list(length=len(months)),
+            db.category_totals.find(month_filter).to_list(length=None),
+            db.income.find(
+                {"user": user_email, "effective_month": {"$lte": to_month}}, {"effective_month": 1, "amount": 1}
+            ).to_list(length=None),
         )
 
+    rollups_by_month = {doc["month"]: doc for doc in rollup_docs}
+    categories_by_month = {}
+    for doc in category_docs:
+        categories_by_month.setdefault(doc["month"], []).append(
+            {"category": doc["category"], "total": round(float(doc.get("total") or 0), 2)}
+        )
+    salaries = SalarySchedule(income_docs)
+
+    summary = []
+    for month in months:
+        summary.append({
+            **rollup_totals(month, salaries.salary_for(month), rollups_by_month.get(month)),
+            "categories": sorted(categories_by_month.get(month, []), key=lambda c: c["category"]),
+        })
+    return {"from": from_month, "to": to_month, "months": summary}
+
 
 async def get_category_totals(user_email: str, month: str = None):
     if not month:
         month = datetime.today().strftime("%Y-%m")
 
-    totals = await db.category_totals.find({
-        "user": user_email,
-        "month": month
-    }).to_list(length=100)
+    with span("db"):
+        totals = await db.category_totals.find({
+            "user": user_email,
+            "month": month
+        }).to_list(length=100)
 
     # Convert ObjectId to str
     return [serialize_doc(t) for t in totals]
 
 
+async def get_month(user_email: str, month: str = None, skip: int = 0, limit: int = TRACKER_PAGE_SIZE):
+    """Tracker data and category totals of a month, fetched concurrently, for one dashboard load."""
+    tracker, totals = await asyncio.gather(
+        get_tracker_data(user_email, month, skip=skip, limit=limit),
+        get_category_totals(user_email, month),
+    )
+    return {"tracker": tracker, "category_totals": totals}
+
+
 async def get_user_expenses(user_email: str):
-    """Return all expense entries for a user across months.
+    """Return all expense entries for a user across months, newest first.
     Matches advisor RAG router expectation.
     """
-    entries = await db.entries.find({
-        "user": user_email,
-        "type": "expense",
-    }).to_list(length=1000)
-    return [serialize_doc(e) for e in entries]
\ No newline at end of file
+    with span("db"):
+        entries = await db.entries.find({
+            "user": user_email,
+            "type": "expense",
+        }).sort([("date", -1), ("_id", -1)]).to_list(length=None)
+    return [serialize_doc(e) for e in entries]
+
+def entries_filter(user_email: str, from_month: str = None, to_month: str = None, type_: str = None, category: str = None):
+    """
+    Query for a user's entries. Month bounds are applied to the "YYYY-MM-DD"
+    date so the (user, date, _id) index serves both the range and the sort.
+    """
+    query = {"user": user_email}
+    date_range = {}
+    if from_month:
+        date_range["$gte"] = f"{from_month}-01"
+    if to_month:
+        date_range["$lte"] = f"{to_month}-31"
+    if date_range:
+        query["date"] = date_range
+    if type_:
+        query["type"] = type_
+    if category:
+        query["category"] = category
+    return query
+
+
+def encode_cursor(doc) -> str:
+    raw = json.dumps([doc["date"], str(doc["_id"])]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str):
+    """Returns (date, ObjectId) of the last entry of the previous page; ValueError if malformed."""
+    try:
+        date, oid = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(date), ObjectId(oid)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+async def list_entries(user_email: str, limit: int = TRACKER_PAGE_SIZE, cursor: str = None, **filters):
+    """
+    One keyset page of entries, newest first (date, then _id, descending).
+    The page ends with next_cursor, or None when there are no more entries.
+    """
+    query = entries_filter(user_email, **filters)
+    if cursor:
+        date, oid = decode_cursor(cursor)
+        after = {"$or": [{"date": {"$lt": date}}, {"date": date, "_id": {"$lt": oid}}]}
+        query = {"$and": [query, after]}
+
+    # One extra document tells whether another page exists
+    with span("db"):
+        docs = await db.entries.find(query).sort([("date", -1), ("_id", -1)]).limit(limit + 1).to_list(length=limit + 1)
+    next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    return {"entries": [serialize_doc(d) for d in docs[:limit]], "next_cursor": next_cursor}
+
+
+async def iter_entries(user_email: str, **filters):
+    """Streams every matching entry from the Motor cursor, newest first, one batch in memory at a time."""
+    cursor = db.entries.find(entries_filter(user_email, **filters), {"user": 0})
+    async for doc in cursor.sort([("date", -1), ("_id", -1)]).batch_size(EXPORT_BATCH_SIZE):
+        yield serialize_doc(doc)
+
+
+async def export_entries_ndjson(user_email: str, **filters):
+    async for doc in iter_entries(user_email, **filters):
+        yield json.dumps({field: doc.get(field) for field in EXPORT_FIELDS}) + "\n"
+
+
+async def export_entries_csv(user_email: str, **filters):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    async for doc in iter_entries(user_email, **filters):
+        writer.writerow([doc.get(field) for field in EXPORT_FIELDS])
+        # Hand each line to the response as soon as it is written
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
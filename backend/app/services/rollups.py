@@ -0,0 +1,163 @@
+"""
+monthly_rollups holds one document per (user, month) with that month's side
+income, expense total and entry count. It is updated together with entries
+and category_totals (see category_totals.write_entries), so a range of months
+is read back in a single query.
+
+Entries written before monthly_rollups existed are backfilled once, at API
+startup (ensure_backfilled). Drifted rollups are repaired with:
+
+    python -m backend.app.services.rollups [--user EMAIL] [--from-month 2025-01] [--to-month 2025-12]
+"""
+import argparse
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from pymongo import DeleteOne, UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from ..database import get_database
+
+logger = logging.getLogger(__name__)
+
+db = get_database()
+
+ROLLUP_FIELDS = {"expense": "expense", "side-income": "side_income"}
+
+BACKFILL_ID = "monthly_rollups_backfill"
+# A backfill marked running for longer than this is assumed dead and taken over
+BACKFILL_LEASE_SECONDS = float(os.getenv("ROLLUP_BACKFILL_LEASE_SECONDS", "600"))
+BACKFILL_POLL_SECONDS = 1.0
+
+
+def rollup_increments(entries):
+    """Per (user, month): {"expense": x, "side_income": y, "entries": n}."""
+    increments = defaultdict(lambda: {"expense": 0.0, "side_income": 0.0, "entries": 0})
+    for entry in entries:
+        fields = increments[(entry["user"], entry["month"])]
+        fields[ROLLUP_FIELDS[entry["type"]]] += entry["amount"]
+        fields["entries"] += 1
+    return increments
+
+
+def month_range(from_month: str = None, to_month: str = None):
+    """Mongo condition for "YYYY-MM" strings between two inclusive bounds (either may be None)."""
+    condition = {}
+    if from_month:
+        condition["$gte"] = from_month
+    if to_month:
+        condition["$lte"] = to_month
+    return condition
+
+
+def rollup_operations(increments):
+    return [
+        UpdateOne({"user": user, "month": month}, {"$inc": fields}, upsert=True)
+        for (user, month), fields in increments.items()
+    ]
+
+
+async def rebuild(user_email: str = None, from_month: str = None, to_month: str = None):
+    """
+    Recomputes rollups from entries for a user (all users if None) and month
+    range, overwriting stored values and deleting rollups of emptied months.
+    Returns the number of rollups written and deleted.
+    """
+    match = {}
+    if user_email:
+        match["user"] = user_email
+    months = month_range(from_month, to_month)
+    if months:
+        match["month"] = months
+
+    def amount_of(type_):
+        return {"$sum": {"$cond": [{"$eq": ["$type", type_]}, "$amount", 0]}}
+
+    operations, seen = [], set()
+    async for row in db.entries.aggregate([
+        {"$match": match},
+        {"$group": {
+            "_id": {"user": "$user", "month": "$month"},
+            "expense": amount_of("expense"),
+            "side_income": amount_of("side-income"),
+            "entries": {"$sum": 1},
+        }},
+    ]):
+        key = (row["_id"]["user"], row["_id"]["month"])
+        seen.add(key)
+        fields = {"expense": float(row["expense"]), "side_income": float(row["side_income"]), "entries": row["entries"]}
+        operations.append(UpdateOne({"user": key[0], "month": key[1]}, {"$set": fields}, upsert=True))
+
+    written = len(operations)
+    async for doc in db.monthly_rollups.find(match, {"user": 1, "month": 1}):
+        if (doc["user"], doc["month"]) not in seen:
+            operations.append(DeleteOne({"_id": doc["_id"]}))
+
+    if operations:
+        await db.monthly_rollups.bulk_write(operations, ordered=False)
+    return {"written": written, "deleted": len(operations) - written}
+
+
+async def _claim_backfill():
+    """True if this process should run the backfill, None while another one does, False once it is done."""
+    now = datetime.now(timezone.utc)
+    try:
+        await db.migrations.insert_one({"_id": BACKFILL_ID, "status": "running", "started_at": now})
+        return True
+    except DuplicateKeyError:
+        pass
+    marker = await db.migrations.find_one_and_update(
+        {"_id": BACKFILL_ID, "status": "running", "started_at": {"$lt": now - timedelta(seconds=BACKFILL_LEASE_SECONDS)}},
+        {"$set": {"started_at": now}},
+    )
+    if marker is not None:
+        return True
+    marker = await db.migrations.find_one({"_id": BACKFILL_ID})
+    return None if marker["status"] == "running" else False
+
+
+async def ensure_backfilled():
+    """
+    Startup step: the first time the API starts against a database, rebuilds
+    every rollup from entries, so months written before monthly_rollups
+    existed read (and are incremented from) their full totals. One process
+    runs it, recorded in the migrations collection; the others wait for it,
+    so no write races the rebuild.
+    """
+    while True:
+        claimed = await _claim_backfill()
+        if claimed is False:
+            return
+        if claimed:
+            break
+        await asyncio.sleep(BACKFILL_POLL_SECONDS)
+
+    logger.info("Backfilling monthly_rollups from entries")
+    try:
+        result = await rebuild()
+    except BaseException:
+        # Let the next start (or a waiting process) retry
+        await db.migrations.delete_one({"_id": BACKFILL_ID})
+        raise
+    await db.migrations.update_one(
+        {"_id": BACKFILL_ID}, {"$set": {"status": "done", "finished_at": datetime.now(timezone.utc), **result}}
+    )
+    logger.info("Backfilled monthly_rollups: wrote %d, deleted %d", result["written"], result["deleted"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Recompute monthly_rollups from entries.")
+    parser.add_argument("--user", help="only this user's rollups (default: all users)")
+    parser.add_argument("--from-month", help="first month, YYYY-MM")
+    parser.add_argument("--to-month", help="last month, YYYY-MM")
+    args = parser.parse_args(argv)
+    result = asyncio.run(rebuild(args.user, args.from_month, args.to_month))
+    print(f"Wrote {result['written']} rollups, deleted {result['deleted']}.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
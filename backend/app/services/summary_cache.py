@@ -0,0 +1,56 @@
+"""
+Cache of the dashboard's month reads (tracker page, category totals, /month),
+rendered to JSON, per (user, month).
+
+Keys carry the month's version from services/versions.py. add_tracker_entry,
+imports and set_monthly_income bump it in the same write as the data, so a
+write makes every cached view of the month unreachable at once in every
+worker, even with the per-process backend. Superseded values then leave
+through the LRU bounds and the TTL.
+"""
+import os
+
+from ..metrics import CACHE_ITEMS, CACHE_LOOKUPS, CACHE_MEMORY
+from ..responses import render_json
+from .cache import MemoryCache, create_cache
+
+# Optional shared store, e.g. redis://localhost:6379/1; in-memory per worker when unset
+SUMMARY_CACHE_URL = os.getenv("SUMMARY_CACHE_URL")
+SUMMARY_CACHE_TTL_SECONDS = int(os.getenv("SUMMARY_CACHE_TTL_SECONDS", "900"))
+SUMMARY_CACHE_MAX_ITEMS = int(os.getenv("SUMMARY_CACHE_MAX_ITEMS", "4096"))
+SUMMARY_CACHE_MAX_BYTES = int(os.getenv("SUMMARY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+_cache = create_cache(
+    SUMMARY_CACHE_URL,
+    namespace="summary",
+    max_items=SUMMARY_CACHE_MAX_ITEMS,
+    default_ttl=SUMMARY_CACHE_TTL_SECONDS,
+    max_bytes=SUMMARY_CACHE_MAX_BYTES,
+    sizeof=len,
+)
+
+
+def _record_size():
+    if isinstance(_cache, MemoryCache):
+        CACHE_ITEMS.set("summary", value=len(_cache))
+        CACHE_MEMORY.set("summary", value=_cache.bytes)
+
+
+async def get_or_render(view: str, user_email: str, month: str, version: str, compute, *variant) -> bytes:
+    """
+    JSON body of a month view at `version`: the cached one, or the result of
+    awaiting compute() rendered and cached. `variant` is whatever else shapes
+    the view (e.g. the page), as in versions.etag.
+    """
+    key = ":".join([view, user_email, month, version, *map(str, variant)])
+    cached = await _cache.get(key)
+    if cached is not None:
+        CACHE_LOOKUPS.inc("summary", "hit")
+        return cached.encode("utf-8")
+
+    CACHE_LOOKUPS.inc("summary", "miss")
+    body = render_json(await compute())
+    # Stored as text so the JSON-based shared backend can hold it too
+    await _cache.set(key, body.decode("utf-8"))
+    _record_size()
+    return body
@@ -0,0 +1,56 @@
+"""
+month_versions holds a counter per (user, month) that every write changing
+what the dashboard shows for that month increments. Income applies to every
+month from its effective month on, so income changes increment the user-wide
+counter (month "*") instead.
+
+Dashboard reads derive their ETag from the counters they depend on, so a
+client revalidating an unchanged month gets a 304 after one indexed lookup
+here, without the entries collection being queried.
+"""
+import hashlib
+from datetime import datetime, timezone
+
+from pymongo import UpdateOne
+
+from ..database import get_database
+
+db = get_database()
+
+ALL_MONTHS = "*"
+
+
+def bump_operations(user_months):
+    now = datetime.now(timezone.utc)
+    return [
+        UpdateOne({"user": user, "month": month}, {"$inc": {"version": 1}, "$set": {"updated_at": now}}, upsert=True)
+        for user, month in sorted(set(user_months))
+    ]
+
+
+async def bump(user_months, session=None):
+    """Increments the counters of the given (user, month) pairs."""
+    operations = bump_operations(user_months)
+    if operations:
+        await db.month_versions.bulk_write(operations, ordered=False, session=session)
+
+
+async def current(user_email: str, month: str) -> str:
+    """The month's counter and the user-wide one, as "month.user"."""
+    versions = {ALL_MONTHS: 0, month: 0}
+    async for doc in db.month_versions.find(
+        {"user": user_email, "month": {"$in": [month, ALL_MONTHS]}}, {"month": 1, "version": 1}
+    ):
+        versions[doc["month"]] = doc["version"]
+    return f"{versions[month]}.{versions[ALL_MONTHS]}"
+
+
+def etag(user_email: str, version: str, *variant) -> str:
+    """
+    Weak ETag for one user's view of a versioned month. `variant` holds
+    whatever else shapes the response (route, page), so different views of
+    the same month never share a tag; the user is part of it so two accounts
+    on one browser never do either.
+    """
+    key = "\x00".join([user_email, version, *map(str, variant)])
+    return f'W/"{hashlib.blake2b(key.encode(), digest_size=12).hexdigest()}"'
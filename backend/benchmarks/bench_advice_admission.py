@@ -0,0 +1,101 @@
+"""
+Request coalescing and load shedding of /api/advisor/financial-advice.
+
+Runs the app in-process (see harness.py) with a slow fake LLM. First one user
+sends --duplicates identical requests at once, as double clicks and reloads
+do: they should share a single generation. Then --users distinct users ask
+at once, more than the admission controller admits and queues: the excess
+should be refused fast with 429 and a Retry-After header instead of waiting
+behind the LLM.
+
+Run from the repository root (needs mongomock-motor):
+
+    python -m backend.benchmarks.bench_advice_admission --users 40 --max-concurrency 4 --max-queue 8
+"""
+import argparse
+import asyncio
+import collections
+import os
+import sys
+import time
+
+from .harness import percentile, register_and_login
+
+
+async def login(client, dashboard, n):
+    email = f"advice{n}@bench.example"
+    headers = await register_and_login(client, email, f"advice{n}")
+    await dashboard.add_tracker_entry(email, 300.0 + n, "expense", "Food", f"Basmati rice pack {n}", "2025-05-10")
+    return headers
+
+
+async def timed(client, headers):
+    start = time.perf_counter()
+    response = await client.get("/api/advisor/financial-advice", headers=headers)
+    return response, time.perf_counter() - start
+
+
+def report(name, results):
+    by_status = collections.defaultdict(list)
+    for response, seconds in results:
+        by_status[response.status_code].append(seconds)
+    for status, seconds in sorted(by_status.items()):
+        retry = {r.headers.get("retry-after") for r, _ in results if r.status_code == status} - {None}
+        print(
+            f"  {name:<10} {status}: n={len(seconds):<4} p50={percentile(seconds, 50) * 1000:8.1f} ms  "
+            f"max={max(seconds) * 1000:8.1f} ms" + (f"  Retry-After={','.join(sorted(retry))}" if retry else "")
+        )
+
+
+async def amain(args):
+    from . import harness
+    from .fakes import FakeChroma, FakeEmbeddings, FakeLLM
+
+    db = harness.in_memory_database()
+    harness.use_database(db)
+    llm = FakeLLM(latency=args.llm_latency)
+    harness.use_fake_advisor(llm, FakeChroma(FakeEmbeddings(latency=0.005)))
+
+    from ..app.indexes import ensure_indexes
+    from ..app.services import dashboard
+    from ..main import app
+
+    await ensure_indexes(db)
+    async with harness.create_client(app) as client:
+        headers = [await login(client, dashboard, n) for n in range(args.users)]
+
+        calls = llm.calls
+        results = await asyncio.gather(*(timed(client, headers[0]) for _ in range(args.duplicates)))
+        print(f"{args.duplicates} identical requests -> {llm.calls - calls} LLM generation(s)")
+        report("duplicates", results)
+
+        calls = llm.calls
+        results = await asyncio.gather(*(timed(client, h) for h in headers[1:]))
+        print(
+            f"{len(headers) - 1} users at once (max {args.max_concurrency} running, {args.max_queue} queued) "
+            f"-> {llm.calls - calls} LLM generation(s)"
+        )
+        report("burst", results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=40)
+    parser.add_argument("--duplicates", type=int, default=10)
+    parser.add_argument("--llm-latency", type=float, default=1.0)
+    parser.add_argument("--max-concurrency", type=int, default=4)
+    parser.add_argument("--max-queue", type=int, default=8)
+    parser.add_argument("--queue-timeout", type=float, default=20.0)
+    args = parser.parse_args()
+
+    # Read by rag_modules.pipeline at import time
+    os.environ["ADVICE_MAX_CONCURRENCY"] = str(args.max_concurrency)
+    os.environ["ADVICE_MAX_QUEUE"] = str(args.max_queue)
+    os.environ["ADVICE_QUEUE_TIMEOUT"] = str(args.queue_timeout)
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+    asyncio.run(amain(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""
+Measures event-loop stalls while advice generations are in flight.
+
+A ticker coroutine stands in for concurrent dashboard requests: it wakes every
+5 ms and records how late it was. The blocking variant reproduces the old
+router (sync retrieval and LLM call inside an async handler); the async
+variant uses pipeline.agenerate_financial_advice.
+
+Run from the repository root:
+
+    python -m backend.benchmarks.bench_advice_loop --requests 8
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from ..rag_modules import pipeline
+from .fakes import FakeChroma, FakeEmbeddings, FakeLLM, synthetic_expense_summary
+from .harness import percentile
+
+TICK = 0.005
+
+
+async def ticker(lags, stop):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - start - TICK)
+
+
+async def blocking_advice(summary, llm, db):
+    context = pipeline.get_matching_products(summary, db)
+    prompt = pipeline.build_advice_prompt().format(context=context, question=summary)
+    return llm.invoke(prompt).content
+
+
+async def async_advice(summary, llm, db):
+    return await pipeline.agenerate_financial_advice(summary, llm, db)
+
+
+async def run(name, fn, args):
+    llm = FakeLLM(latency=args.llm_latency)
+    db = FakeChroma(FakeEmbeddings(latency=0.005))
+    summary = synthetic_expense_summary(args.expenses)
+
+    lags = []
+    stop = asyncio.Event()
+    tick_task = asyncio.create_task(ticker(lags, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(fn(summary, llm, db) for _ in range(args.requests)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await tick_task
+
+    print(
+        f"{name:<9} requests={args.requests} wall={elapsed:6.2f}s ticks={len(lags):<5} "
+        f"lag_p50={statistics.median(lags) * 1000:7.1f} ms lag_p99={percentile(lags, 99) * 1000:8.1f} ms "
+        f"lag_max={max(lags) * 1000:8.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=8)
+    parser.add_argument("--expenses", type=int, default=100)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds per fake generation")
+    args = parser.parse_args()
+
+    asyncio.run(run("blocking", blocking_advice, args))
+    asyncio.run(run("async", async_advice, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Throughput and p50/p95/p99 latency of the main API endpoints under concurrency.
+
+Runs the app from backend.main in-process (see harness.py) against an
+in-memory MongoDB (mongomock-motor) or, with --mongo-url, a scratch database
+on a real server, with fake LLM/embeddings for the advisor. It seeds
+synthetic users with --history entries each, then drives register, token,
+tracker (plain, and revalidated with the ETag of the previous response, as
+a browser does), category-totals, entry insert and financial-advice with
+--concurrency clients. Results are written as JSON. --compare prints the
+change against an earlier result file.
+
+Run from the repository root (needs mongomock-motor unless --mongo-url is given):
+
+    python -m backend.benchmarks.bench_api --users 20 --history 2000 --requests 200 --concurrency 20
+"""
+import argparse
+import asyncio
+import datetime
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+from .harness import PASSWORD, percentile, register_and_login
+
+SCENARIOS = ["register", "token", "tracker", "tracker_revalidate", "category_totals", "entry_insert", "advice"]
+CATEGORIES = ["Food", "Transport", "Utilities", "Healthcare", "Entertainment", "Other"]
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def summarize(latencies, errors, seconds):
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "seconds": round(seconds, 3),
+        "throughput_rps": round(len(ordered) / seconds, 1) if seconds else 0.0,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+        "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+async def measure(make_request, total, concurrency):
+    """Sends `total` requests from `concurrency` workers; returns the summary."""
+    counter = itertools.count()
+    latencies, errors = [], 0
+
+    async def worker():
+        nonlocal errors
+        while (i := next(counter)) < total:
+            start = time.perf_counter()
+            response = await make_request(i)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+def synthetic_history(n_entries, months):
+    return [
+        {
+            "amount": float(100 + (i * 37) % 900),
+            "type": "expense" if i % 10 else "side-income",
+            "category": CATEGORIES[i % len(CATEGORIES)],
+            "description": f"synthetic entry {i}",
+            "date": f"{months[i % len(months)]}-{1 + i % 28:02d}",
+        }
+        for i in range(n_entries)
+    ]
+
+
+async def seed(client, dashboard, n_users, history, months):
+    """Registers users, gives them an income and `history` entries; returns their auth headers."""
+    headers = []
+    for u in range(n_users):
+        email = f"user{u}@bench.example"
+        headers.append(await register_and_login(client, email, f"user{u}"))
+        await dashboard.set_monthly_income(email, 150000.0, months[0])
+        rows = synthetic_history(history, months)
+        for start in range(0, len(rows), dashboard.MAX_IMPORT_ROWS):
+            await dashboard.import_entries(email, rows[start:start + dashboard.MAX_IMPORT_ROWS])
+    return headers
+
+
+def request_factories(client, headers, months, run_id):
+    def user(i):
+        return headers[i % len(headers)]
+
+    def month(i):
+        return months[i % len(months)]
+
+    etags = {}
+
+    async def revalidate_tracker(i):
+        # What a browser does on a repeated view: send back the ETag it holds
+        key = (i % len(headers), month(i))
+        conditional = {"If-None-Match": etags[key]} if key in etags else {}
+        response = await client.get(
+            "/api/dashboard/tracker", params={"month": month(i)}, headers={**user(i), **conditional}
+        )
+        etags[key] = response.headers.get("etag", "")
+        return response
+
+    return {
+        "register": lambda i: client.post("/api/user/register", json={
+            "email": f"new{run_id}-{i}@bench.example", "username": f"new{run_id}-{i}", "city": "Karachi",
+            "password": PASSWORD,
+        }),
+        "token": lambda i: client.post(
+            "/api/user/token", data={"username": f"user{i % len(headers)}@bench.example", "password": PASSWORD}
+        ),
+        "tracker": lambda i: client.get("/api/dashboard/tracker", params={"month": month(i)}, headers=user(i)),
+        "tracker_revalidate": revalidate_tracker,
+        "category_totals": lambda i: client.get(
+            "/api/dashboard/category-totals", params={"month": month(i)}, headers=user(i)
+        ),
+        "entry_insert": lambda i: client.post("/api/dashboard/tracker/entry", headers=user(i), json={
+            "amount": 250.0, "type": "expense", "category": CATEGORIES[i % len(CATEGORIES)],
+            "description": "benchmark insert", "date": f"{month(i)}-15",
+        }),
+        "advice": lambda i: client.get("/api/advisor/financial-advice", headers=user(i)),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, previous_path):
+    with open(previous_path) as f:
+        earlier = json.load(f)
+    previous, results = earlier["scenarios"], report["scenarios"]
+    print(f"\nchange vs {previous_path} ({earlier.get('git_commit')}):")
+    differing = sorted(k for k, v in report["config"].items() if earlier.get("config", {}).get(k) != v)
+    if differing:
+        print(f"  note: config differs in {', '.join(differing)}")
+    for name, stats in results.items():
+        if name not in previous:
+            continue
+        before = previous[name]
+        deltas = "  ".join(
+            f"{key}={(stats[key] - before[key]) / before[key] * 100:+6.1f}%" if before[key] else f"{key}=   n/a"
+            for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms")
+        )
+        print(f"  {name:<16} {deltas}")
+
+
+async def amain(args):
+    from . import harness
+    from .fakes import FakeChroma, FakeEmbeddings, FakeLLM
+
+    db = harness.scratch_database(args.mongo_url) if args.mongo_url else harness.in_memory_database()
+    harness.use_database(db, transactions=bool(args.mongo_url))
+    llm = FakeLLM(latency=args.llm_latency)
+    harness.use_fake_advisor(llm, FakeChroma(FakeEmbeddings(latency=args.embedding_latency)))
+
+    from ..app.indexes import ensure_indexes
+    from ..app.services import dashboard
+    from ..main import app
+
+    months = [f"2025-{m:02d}" for m in range(1, args.months + 1)]
+    try:
+        await ensure_indexes(db)
+        async with harness.create_client(app) as client:
+            start = time.perf_counter()
+            headers = await seed(client, dashboard, args.users, args.history, months)
+            print(f"seeded {args.users} users x {args.history} entries in {time.perf_counter() - start:.1f}s")
+
+            factories = request_factories(client, headers, months, run_id=int(time.time()))
+            results = {}
+            for name in args.scenarios:
+                llm_calls = llm.calls
+                results[name] = await measure(factories[name], args.requests, args.concurrency)
+                if name == "advice":
+                    results[name]["llm_calls"] = llm.calls - llm_calls
+                s = results[name]
+                print(
+                    f"{name:<16} {s['throughput_rps']:>8.1f} req/s  p50={s['p50_ms']:8.2f} ms  "
+                    f"p95={s['p95_ms']:8.2f} ms  p99={s['p99_ms']:8.2f} ms  errors={s['errors']}"
+                )
+    finally:
+        if args.mongo_url:
+            await db.client.drop_database(db.name)
+
+    report = {
+        "benchmark": "bench_api",
+        "started_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "scenarios": results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"bench_api-{report['started_at'].replace(':', '').replace('+0000', 'Z')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {output}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--history", type=int, default=500, help="entries seeded per user")
+    parser.add_argument("--months", type=int, default=6, help="months the history is spread over")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--scenarios", nargs="*", default=SCENARIOS, choices=SCENARIOS)
+    parser.add_argument("--bcrypt-rounds", type=int, default=10)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds per fake LLM generation")
+    parser.add_argument("--embedding-latency", type=float, default=0.02, help="seconds per fake embedding call")
+    parser.add_argument("--mongo-url", help="use a scratch database on this server instead of mongomock")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/bench_api-<time>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    args = parser.parse_args()
+
+    # Read by services.auth at import time
+    os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    asyncio.run(amain(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
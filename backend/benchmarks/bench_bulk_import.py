@@ -0,0 +1,72 @@
+"""
+Entry import throughput: one POST /tracker/entry per row against the bulk import.
+
+Both paths write through services/dashboard.py to a fake Motor database that
+charges a fixed latency per round-trip, so the numbers reflect round-trips,
+not MongoDB's own write speed.
+
+Run from the repository root:
+
+    python -m backend.benchmarks.bench_bulk_import --rows 2000 --latency 0.001
+"""
+import argparse
+import asyncio
+import time
+
+from ..app.services import category_totals, dashboard, versions
+from .fakes import EXPENSE_WORDS, FakeMongoDatabase
+
+CATEGORIES = ["Food", "Transport", "Utilities", "Healthcare", "Entertainment", "Other"]
+
+
+def statement_rows(n_rows):
+    return [
+        {
+            "amount": float(100 + (i * 37) % 900),
+            "type": "expense" if i % 10 else "side-income",
+            "category": CATEGORIES[i % len(CATEGORIES)],
+            "description": EXPENSE_WORDS[i % len(EXPENSE_WORDS)],
+            "date": f"2025-{1 + i % 3:02d}-{1 + i % 28:02d}",
+        }
+        for i in range(n_rows)
+    ]
+
+
+async def one_by_one(rows):
+    for row in rows:
+        await dashboard.add_tracker_entry(
+            "bench@example.com", row["amount"], row["type"], row["category"], row["description"], row["date"]
+        )
+
+
+async def bulk(rows):
+    await dashboard.import_entries("bench@example.com", rows)
+
+
+async def run(name, fn, rows, latency):
+    dashboard.db = category_totals.db = versions.db = FakeMongoDatabase(latency)
+    category_totals._transactions_supported = False
+    start = time.perf_counter()
+    await fn(rows)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:<11} rows={len(rows):<6} round_trips={dashboard.db.round_trips:<6} "
+        f"{elapsed:7.3f}s  {len(rows) / elapsed:>10,.0f} rows/sec"
+    )
+
+
+async def amain(args):
+    rows = statement_rows(args.rows)
+    await run("one-by-one", one_by_one, rows, args.latency)
+    await run("bulk", bulk, rows, args.latency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.001, help="seconds per MongoDB round-trip")
+    asyncio.run(amain(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
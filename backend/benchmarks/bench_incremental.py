@@ -0,0 +1,59 @@
+"""
+Prompt size and LLM work per request as an expense history grows, for the
+full-history prompt and the incremental per-item mode.
+
+Each step adds `--step` new expenses and requests advice again; the
+incremental mode should only send the new items to the LLM.
+
+Run from the repository root:
+
+    python -m backend.benchmarks.bench_incremental --steps 10 --step 100
+"""
+import argparse
+import asyncio
+import time
+
+from ..app.services.advice import build_expenses_summary
+from ..rag_modules import pipeline
+from ..rag_modules.incremental import ItemAnalysisMemo
+from .fakes import FakeChroma, FakeEmbeddings, FakeItemLLM, FakeLLM, synthetic_expenses
+
+
+async def main_async(args):
+    db = FakeChroma(FakeEmbeddings(latency=0.0))
+    memo = ItemAnalysisMemo(path=None)
+    full_llm = FakeLLM(latency=0.0)
+    item_llm = FakeItemLLM(latency=0.0)
+    history = synthetic_expenses(args.steps * args.step)
+
+    print(f"{'expenses':>8} | {'full prompt':>11} | {'incr. max prompt':>16} {'items sent':>10} {'llm calls':>9} {'wall':>9}")
+    for step in range(1, args.steps + 1):
+        expenses = history[:step * args.step]
+
+        full_llm.prompts.clear()
+        await pipeline.agenerate_financial_advice(build_expenses_summary(expenses), full_llm, db)
+        full_chars = len(full_llm.prompts[-1])
+
+        item_llm.prompts.clear()
+        sent, calls = item_llm.items, item_llm.calls
+        start = time.perf_counter()
+        result = await pipeline.agenerate_incremental_advice(expenses, item_llm, db, memo=memo)
+        elapsed = time.perf_counter() - start
+        max_chars = max((len(p) for p in item_llm.prompts), default=0)
+
+        print(
+            f"{len(expenses):>8} | {full_chars:>11,} | {max_chars:>16,} {item_llm.items - sent:>10} "
+            f"{item_llm.calls - calls:>9} {elapsed * 1000:>7.1f}ms  total_savings={result['total_savings']:,.0f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--step", type=int, default=100)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
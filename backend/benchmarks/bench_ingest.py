@@ -0,0 +1,67 @@
+"""
+Throughput of the product catalog ingestion pipeline.
+
+Writes a synthetic price list, ingests it into an in-memory collection twice
+(the second run should skip every unchanged row) and then once more with a
+fraction of the prices changed.
+
+Run from the repository root:
+
+    python -m backend.benchmarks.bench_ingest --rows 100000
+"""
+import argparse
+import csv
+import os
+import random
+import tempfile
+
+from ..rag_modules.embedding_cache import CachedEmbeddings
+from ..rag_modules.ingest import ingest_rows, iter_rows
+from .fakes import FakeCollection, FakeEmbeddings
+
+NAMES = ["Basmati Rice", "Sella Rice", "Fresh Milk", "Sugar", "Atta Flour", "Cooking Oil", "Eggs",
+         "Chicken", "Tea Leaves", "Mango Juice", "Bread", "Yogurt", "Dal Chana", "Shampoo"]
+SIZES = ["250g", "500g", "1kg", "5kg", "250ml", "1 liter", "1.5 l", "6 pcs", "12 pcs", "1 dozen"]
+
+
+def write_price_list(path, n_rows, seed=0, changed_fraction=0.0):
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "store", "quantity", "price", "category"])
+        for i in range(n_rows):
+            price = 50 + (i * 37) % 2000
+            if changed_fraction and rng.random() < changed_fraction:
+                price += 10
+            writer.writerow([NAMES[i % len(NAMES)], f"Store {i // len(NAMES)}", SIZES[i % len(SIZES)], price, "Groceries"])
+
+
+def run(name, path, collection, embeddings, batch_size):
+    stats = ingest_rows(iter_rows(path), collection, embeddings, batch_size=batch_size, log=lambda _: None)
+    print(
+        f"{name:<9} rows={stats.rows:<7} upserted={stats.upserted:<7} unchanged={stats.unchanged:<7} "
+        f"invalid={stats.invalid:<3} {stats.seconds:6.2f}s  {stats.rows_per_second:>9,.0f} rows/sec"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "prices.csv")
+        write_price_list(path, args.rows)
+        embeddings = CachedEmbeddings(FakeEmbeddings(latency=0.05), path=os.path.join(tmp, "cache.sqlite3"))
+        collection = FakeCollection(FakeEmbeddings(latency=0.0), [])
+
+        run("initial", path, collection, embeddings, args.batch_size)
+        run("unchanged", path, collection, embeddings, args.batch_size)
+        write_price_list(path, args.rows, changed_fraction=0.05)
+        run("5% prices", path, collection, embeddings, args.batch_size)
+        print(f"embedding cache: {embeddings.stats()}")
+
+
+if __name__ == "__main__":
+    main()
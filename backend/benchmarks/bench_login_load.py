@@ -0,0 +1,111 @@
+"""
+/api/dashboard/tracker latency while a burst of logins is being verified.
+
+Runs the real FastAPI app in-process (httpx ASGITransport) against an
+in-memory MongoDB (mongomock-motor), measures tracker latency at rest, then
+again while N logins run concurrently. "pool" is the current code, with bcrypt
+on the password hashing pool. "inline" runs the same bcrypt calls on the event
+loop, as the code did before.
+
+Run from the repository root (needs mongomock-motor):
+
+    python -m backend.benchmarks.bench_login_load --logins 50 --rounds 12
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from .harness import percentile
+
+
+def percentiles(samples):
+    return (
+        f"p50={percentile(samples, 50) * 1000:7.1f} ms  p95={percentile(samples, 95) * 1000:7.1f} ms  "
+        f"max={max(samples) * 1000:7.1f} ms  n={len(samples)}"
+    )
+
+
+async def timed_get(client, url, headers):
+    start = time.perf_counter()
+    response = await client.get(url, headers=headers)
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def tracker_probe(client, headers, stop, interval):
+    samples = []
+    while not stop.is_set():
+        samples.append(await timed_get(client, "/api/dashboard/tracker", headers))
+        await asyncio.sleep(interval)
+    return samples
+
+
+async def run(client, headers, n_logins, interval):
+    baseline = [await timed_get(client, "/api/dashboard/tracker", headers) for _ in range(20)]
+
+    stop = asyncio.Event()
+    probe = asyncio.create_task(tracker_probe(client, headers, stop, interval))
+    start = time.perf_counter()
+    logins = await asyncio.gather(*(
+        client.post("/api/user/token", data={"username": "load@example.com", "password": "correct horse"})
+        for _ in range(n_logins)
+    ))
+    login_seconds = time.perf_counter() - start
+    stop.set()
+    under_load = await probe
+
+    assert all(r.status_code == 200 for r in logins)
+    return baseline, under_load, login_seconds
+
+
+async def amain(args):
+    from . import harness
+    from ..app.services import auth
+
+    db = harness.in_memory_database()
+    harness.use_database(db)
+    from ..app.indexes import ensure_indexes
+    from ..main import app
+
+    # As at startup: registration relies on the unique indexes on users
+    await ensure_indexes(db)
+
+    pooled = auth.run_password_op
+
+    async def inline(fn, *fn_args):
+        return fn(*fn_args)
+
+    async with harness.create_client(app) as client:
+        await client.post("/api/user/register", json={
+            "email": "load@example.com", "username": "load", "city": "Lahore", "password": "correct horse",
+        })
+        token = (await client.post(
+            "/api/user/token", data={"username": "load@example.com", "password": "correct horse"}
+        )).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        for name, op in (("pool", pooled), ("inline", inline)):
+            auth.run_password_op = op
+            baseline, under_load, login_seconds = await run(client, headers, args.logins, args.interval)
+            print(f"{name}: {args.logins} logins in {login_seconds:.2f}s")
+            print(f"  tracker at rest     {percentiles(baseline)}")
+            print(f"  tracker under load  {percentiles(under_load)}  "
+                  f"(median x{statistics.median(under_load) / statistics.median(baseline):.1f})")
+        auth.run_password_op = pooled
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost (sets BCRYPT_ROUNDS)")
+    parser.add_argument("--interval", type=float, default=0.01, help="seconds between tracker probes")
+    args = parser.parse_args()
+
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    asyncio.run(amain(args))
+
+
+if __name__ == "__main__":
+    main()
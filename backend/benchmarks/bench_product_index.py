@@ -0,0 +1,53 @@
+"""
+Lookup cost of the in-process ProductIndex against Chroma-style queries.
+
+Builds a synthetic catalog, then resolves the terms of an expense summary
+through (a) embedding + collection query and (b) the local index with
+lexical short-circuiting, counting embedding calls and timing each path.
+
+Run from the repository root:
+
+    python -m backend.benchmarks.bench_product_index --products 5000
+"""
+import argparse
+import time
+
+from ..rag_modules.product_index import ProductIndex
+from ..rag_modules.retrieval import extract_terms, search_terms
+from .fakes import PRODUCT_LINES, FakeChroma, FakeEmbeddings, synthetic_expense_summary
+
+
+def synthetic_catalog(n_products):
+    return [f"{PRODUCT_LINES[i % len(PRODUCT_LINES)]} (variant {i})" for i in range(n_products)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--expenses", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    embeddings = FakeEmbeddings(latency=0.0)
+    db = FakeChroma(embeddings, documents=synthetic_catalog(args.products))
+    db._collection.latency = 0.0
+    terms = extract_terms(synthetic_expense_summary(args.expenses))
+
+    start = time.perf_counter()
+    index = ProductIndex.from_collection(db._collection)
+    print(f"index build: {len(index)} products, {(time.perf_counter() - start) * 1000:.1f} ms, {len(terms)} terms")
+
+    for name, kwargs in (("chroma", {}), ("index", {"index": index})):
+        embeddings.reset()
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            matches = search_terms(db, terms, **kwargs)
+        elapsed = (time.perf_counter() - start) / args.repeat
+        print(
+            f"{name:<7} per request={elapsed * 1000:9.2f} ms  per term={elapsed / len(terms) * 1e6:8.1f} us  "
+            f"embedded_texts/request={embeddings.texts / args.repeat:6.1f}  matches={len(matches)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Compares the per-word product lookup with the batched retrieval path.
+
+Run from the repository root:
+
+    python -m backend.benchmarks.bench_retrieval --expenses 300
+"""
+import argparse
+import os
+import re
+import tempfile
+import time
+
+from ..rag_modules.context import assemble_context, count_tokens
+from ..rag_modules.embedding_cache import CachedEmbeddings
+from ..rag_modules.retrieval import extract_terms, search_terms
+from .fakes import FakeChroma, FakeEmbeddings, synthetic_expense_summary
+
+
+def legacy_matching_products(expense_text, db, top_k=1):
+    """The original one-similarity_search-per-word loop, kept for comparison."""
+    matches = []
+    words = re.findall(r"[A-Za-z]+", expense_text.lower())
+
+    seen = set()
+    for word in words:
+        if word not in seen:
+            seen.add(word)
+            res = db.similarity_search(word, k=top_k)
+            if res:
+                matches.extend(res)
+
+    return "\n".join([doc.page_content for doc in matches])
+
+
+def batched_matching_products(expense_text, db, top_k=1):
+    matches = search_terms(db, extract_terms(expense_text), top_k=top_k)
+    return "\n".join(match.content for match in matches)
+
+
+def run(name, fn, summary, latency):
+    embeddings = FakeEmbeddings(latency=latency)
+    db = FakeChroma(embeddings)
+    start = time.perf_counter()
+    context = fn(summary, db)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:<8} embed_calls={embeddings.calls:<5} embedded_texts={embeddings.texts:<5} "
+        f"chroma_queries={db._collection.queries:<5} wall={elapsed * 1000:8.1f} ms "
+        f"context_lines={len(context.splitlines())}"
+    )
+    return context
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--expenses", type=int, default=300)
+    parser.add_argument("--budget", type=int, default=60, help="context token budget to compare")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="simulated embedding round-trip")
+    args = parser.parse_args()
+
+    summary = synthetic_expense_summary(args.expenses)
+    print(f"{args.expenses} expenses, {len(extract_terms(summary))} unique terms")
+    legacy = run("legacy", legacy_matching_products, summary, args.latency_ms / 1000)
+    batched = run("batched", batched_matching_products, summary, args.latency_ms / 1000)
+    assert set(batched.splitlines()) == set(legacy.splitlines()), "batched context differs"
+
+    db = FakeChroma(FakeEmbeddings(latency=0.0))
+    matches = search_terms(db, extract_terms(summary))
+    for budget in (0, args.budget):
+        assembled = assemble_context(matches, summary, budget)
+        print(
+            f"budget={budget or 'none':<6} products={assembled.products:<4} dropped={assembled.dropped:<4} "
+            f"context_tokens={assembled.tokens} (legacy: {count_tokens(legacy)})"
+        )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "embedding_cache.sqlite3")
+        for name in ("cold", "warm"):
+            embeddings = FakeEmbeddings(latency=args.latency_ms / 1000)
+            cache = CachedEmbeddings(embeddings, path=path)
+            db = FakeChroma(embeddings)
+            db._embedding_function = cache
+            start = time.perf_counter()
+            batched_matching_products(summary, db)
+            elapsed = time.perf_counter() - start
+            print(f"{name:<8} embed_calls={embeddings.calls:<5} wall={elapsed * 1000:8.1f} ms cache={cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Import-time budget of the API process.
+
+Imports backend.main in a fresh interpreter under `python -X importtime`,
+reports the total and the slowest modules (cumulative), and exits non-zero
+when the total exceeds --budget or when a module listed in --forbid was
+imported (by default LangChain, OpenAI and Chroma, which must stay lazy).
+
+Run from the repository root:
+
+    python -m backend.benchmarks.bench_startup --budget 1.0
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+LAZY_MODULES = ["langchain", "langchain_community", "langchain_openai", "openai", "chromadb", "tiktoken"]
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def import_times(module, env):
+    """(module, self µs, cumulative µs, depth) for every import made by `import module`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="backend.main")
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds allowed for the import")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--forbid", nargs="*", default=LAZY_MODULES, help="top-level packages that must not be imported")
+    args = parser.parse_args()
+
+    # Without an API key, as on a dashboard-only worker
+    env = {k: v for k, v in os.environ.items() if k != "OPENAI_API_KEY"}
+    rows = import_times(args.module, env)
+    position = next(i for i, row in enumerate(rows) if row[0] == args.module and row[3] == 0)
+    total = rows[position][2] / 1e6
+
+    # Direct imports of the module are the depth-1 rows printed just before it
+    direct = []
+    for row in reversed(rows[:position]):
+        if row[3] == 0:
+            break
+        if row[3] == 1:
+            direct.append(row)
+
+    print(f"import {args.module}: {total:.3f}s ({position} modules, budget {args.budget:.3f}s)")
+    for name, _, cumulative, _ in sorted(direct, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f"  {cumulative / 1000:9.1f} ms  {name}")
+
+    loaded = sorted({name.split(".")[0] for name, *_ in rows[:position]} & set(args.forbid))
+    if loaded:
+        print(f"FAIL: eagerly imported {', '.join(loaded)}")
+    if total > args.budget:
+        print("FAIL: over budget")
+    return 1 if loaded or total > args.budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
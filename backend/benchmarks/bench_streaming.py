@@ -0,0 +1,86 @@
+"""
+Time-to-first-byte of the SSE advice stream against the buffered JSON path,
+using a fake streaming LLM. Also checks that the streamed tokens reassemble
+into exactly the advice the JSON path returns, and that a repeated request
+is answered from the advice cache.
+
+Run from the repository root:
+
+    python -m backend.benchmarks.bench_streaming
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from ..app.routers import advisor_rag
+from ..app.services.advice import build_expenses_summary
+from ..rag_modules import pipeline
+from .fakes import FakeChroma, FakeEmbeddings, FakeStreamingLLM, synthetic_expenses
+
+REPLY = (
+    "You paid 400 PKR for 1000 grams of rice, but a similar product in our records costs "
+    "300 PKR for the same weight, so switching could save you 100 PKR every month."
+)
+
+
+def parse_sse(raw):
+    event, data = "message", None
+    for line in raw.strip().splitlines():
+        if line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: "):
+            data = json.loads(line[len("data: "):])
+    return event, data
+
+
+async def main_async(args):
+    llm = FakeStreamingLLM(
+        first_token_latency=args.first_token, token_interval=args.token_interval, reply=REPLY
+    )
+    db = FakeChroma(FakeEmbeddings(latency=0.005))
+    expenses = synthetic_expenses(args.expenses)
+    summary = build_expenses_summary(expenses)
+
+    start = time.perf_counter()
+    advice = await pipeline.agenerate_financial_advice(summary, llm, db)
+    buffered = time.perf_counter() - start
+    print(f"json     ttfb={buffered * 1000:8.1f} ms total={buffered * 1000:8.1f} ms")
+
+    # The router streams from the module-level resources; point them at the fakes
+    original = pipeline.ensure_resources
+    pipeline.ensure_resources = lambda: (llm, db)
+    try:
+        for name in ("sse", "sse-hit"):
+            tokens, first, events = [], None, []
+            calls = llm.calls
+            start = time.perf_counter()
+            async for raw in advisor_rag.stream_advice_events("bench@example.com", expenses, summary):
+                first = first or time.perf_counter() - start
+                event, data = parse_sse(raw)
+                events.append(event)
+                if event == "message":
+                    tokens.append(data["token"])
+            total = time.perf_counter() - start
+
+            print(
+                f"{name:<8} ttfb={first * 1000:8.1f} ms total={total * 1000:8.1f} ms "
+                f"events={len(events):<3} llm_calls={llm.calls - calls}"
+            )
+            assert events[-1] == "done", f"stream did not finish cleanly: {events[-1]}"
+            assert "".join(tokens) == advice, "streamed tokens differ from buffered advice"
+    finally:
+        pipeline.ensure_resources = original
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--expenses", type=int, default=100)
+    parser.add_argument("--first-token", type=float, default=0.3, help="seconds to first fake token")
+    parser.add_argument("--token-interval", type=float, default=0.02)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+"""
+Local stand-ins for the OpenAI embeddings, the Chroma product collection and
+MongoDB writes, so benchmarks run offline and count every remote round-trip
+they would make.
+"""
+import asyncio
+import hashlib
+import json
+import math
+import re
+import time
+
+from bson import ObjectId
+
+PRODUCT_LINES = [
+    "Basmati Rice, 1000g, 300 PKR",
+    "Sella Rice, 5kg, 1450 PKR",
+    "Fresh Milk, 1 liter, 220 PKR",
+    "Olpers Milk, 1.5 liter, 330 PKR",
+    "Petrol, 1 liter, 265 PKR",
+    "Diesel, 1 liter, 275 PKR",
+    "Sugar, 1kg, 150 PKR",
+    "Atta Flour, 10kg, 1200 PKR",
+    "Cooking Oil, 1 liter, 520 PKR",
+    "Eggs, 12 pcs, 330 PKR",
+    "Chicken, 1kg, 650 PKR",
+    "Tea Leaves, 950g, 1650 PKR",
+    "Mango Juice, 1 liter, 200 PKR",
+    "Bread, 1 pcs, 160 PKR",
+    "Yogurt, 1kg, 240 PKR",
+    "Tomatoes, 1kg, 180 PKR",
+    "Onions, 1kg, 120 PKR",
+    "Potatoes, 1kg, 90 PKR",
+    "Dal Chana, 1kg, 280 PKR",
+    "Shampoo, 400ml, 750 PKR",
+]
+
+EXPENSE_WORDS = [
+    "rice", "milk", "fuel", "petrol", "sugar", "flour", "oil", "eggs", "chicken",
+    "tea", "juice", "bread", "yogurt", "tomatoes", "onions", "potatoes", "dal",
+    "shampoo", "groceries", "transport", "bill", "electricity", "internet",
+]
+
+
+class FakeEmbeddings:
+    """
+    Deterministic hashing embeddings with a simulated per-call network latency.
+    `calls` counts round-trips and `texts` counts embedded strings.
+    """
+
+    def __init__(self, dim=64, latency=0.005, model="fake-embedding"):
+        self.dim = dim
+        self.latency = latency
+        self.model = model
+        self.calls = 0
+        self.texts = 0
+
+    def _vector(self, text):
+        digest = hashlib.sha256(text.lower().encode("utf-8")).digest()
+        raw = [digest[i % len(digest)] / 255.0 - 0.5 for i in range(self.dim)]
+        norm = math.sqrt(sum(x * x for x in raw)) or 1.0
+        return [x / norm for x in raw]
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        self.texts += len(texts)
+        time.sleep(self.latency)
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    def reset(self):
+        self.calls = 0
+        self.texts = 0
+
+
+class FakeDocument:
+    def __init__(self, page_content, metadata=None):
+        self.page_content = page_content
+        self.metadata = metadata or {}
+
+
+class FakeCollection:
+    """Brute-force L2 search with the shape of chromadb's Collection.query/get."""
+
+    def __init__(self, embeddings, documents, latency=0.002):
+        self.latency = latency
+        self.queries = 0
+        self.ids = [f"product-{i}" for i in range(len(documents))]
+        self.documents = list(documents)
+        self.metadatas = [{} for _ in documents]
+        self.vectors = embeddings.embed_documents(self.documents)
+        embeddings.reset()
+
+    def count(self):
+        return len(self.ids)
+
+    def query(self, query_embeddings, n_results=1, include=("documents", "distances")):
+        self.queries += 1
+        time.sleep(self.latency)
+        result = {"ids": [], "documents": [], "distances": []}
+        for q in query_embeddings:
+            scored = sorted(
+                (sum((a - b) ** 2 for a, b in zip(q, v)), i)
+                for i, v in enumerate(self.vectors)
+            )[:n_results]
+            result["ids"].append([self.ids[i] for _, i in scored])
+            result["documents"].append([self.documents[i] for _, i in scored])
+            result["distances"].append([d for d, _ in scored])
+        return result
+
+    def get(self, ids=None, include=("documents", "metadatas")):
+        rows = range(len(self.ids))
+        if ids is not None:
+            positions = {product_id: row for row, product_id in enumerate(self.ids)}
+            rows = [positions[product_id] for product_id in ids if product_id in positions]
+        return {
+            "ids": [self.ids[row] for row in rows],
+            "documents": [self.documents[row] for row in rows],
+            "metadatas": [self.metadatas[row] for row in rows],
+            "embeddings": [list(self.vectors[row]) for row in rows],
+        }
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        positions = {product_id: row for row, product_id in enumerate(self.ids)}
+        for product_id, vector, document, metadata in zip(ids, embeddings, documents, metadatas):
+            row = positions.get(product_id)
+            if row is None:
+                positions[product_id] = len(self.ids)
+                self.ids.append(product_id)
+                self.vectors.append(vector)
+                self.documents.append(document)
+                self.metadatas.append(metadata)
+            else:
+                self.vectors[row] = vector
+                self.documents[row] = document
+                self.metadatas[row] = metadata
+
+
+class FakeChroma:
+    """Mimics the parts of langchain_community's Chroma wrapper the pipeline uses."""
+
+    def __init__(self, embeddings=None, documents=PRODUCT_LINES):
+        self._embedding_function = embeddings or FakeEmbeddings()
+        self._collection = FakeCollection(self._embedding_function, documents)
+
+    @property
+    def embeddings(self):
+        return self._embedding_function
+
+    def similarity_search(self, query, k=4):
+        vector = self._embedding_function.embed_query(query)
+        result = self._collection.query([vector], n_results=k)
+        return [FakeDocument(doc) for doc in result["documents"][0]]
+
+
+class FakeMessage:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeLLM:
+    """Chat model stand-in that sleeps for `latency` seconds per generation."""
+
+    def __init__(self, latency=1.0, reply="You could save about 250 PKR by switching brands."):
+        self.latency = latency
+        self.reply = reply
+        self.calls = 0
+        self.prompts = []
+
+    def invoke(self, prompt):
+        self.calls += 1
+        self.prompts.append(prompt)
+        time.sleep(self.latency)
+        return FakeMessage(self.reply)
+
+    async def ainvoke(self, prompt):
+        self.calls += 1
+        self.prompts.append(prompt)
+        await asyncio.sleep(self.latency)
+        return FakeMessage(self.reply)
+
+
+class FakeStreamingLLM(FakeLLM):
+    """
+    Emits the reply word by word: the first chunk after `first_token_latency`,
+    then one chunk every `token_interval` seconds.
+    """
+
+    def __init__(self, first_token_latency=0.3, token_interval=0.02, **kwargs):
+        super().__init__(**kwargs)
+        self.first_token_latency = first_token_latency
+        self.token_interval = token_interval
+        tokens = self.reply.split(" ")
+        self.latency = first_token_latency + token_interval * (len(tokens) - 1)
+
+    async def astream(self, prompt):
+        self.calls += 1
+        self.prompts.append(prompt)
+        await asyncio.sleep(self.first_token_latency)
+        for i, word in enumerate(self.reply.split(" ")):
+            if i:
+                await asyncio.sleep(self.token_interval)
+            yield FakeMessage(word if i == 0 else " " + word)
+
+
+class FakeItemLLM(FakeLLM):
+    """
+    Answers the incremental per-item prompt with a JSON array, claiming 10%
+    savings on every listed expense. `items` counts expenses sent to it.
+    """
+
+    ITEM_LINE = re.compile(r"^(\d+)\. Price: ([\d.]+)\.", re.MULTILINE)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.items = 0
+
+    def _reply(self, prompt):
+        rows = self.ITEM_LINE.findall(prompt)
+        self.items += len(rows)
+        return json.dumps([
+            {"id": int(number), "advice": f"Item {number} could be 10% cheaper.", "savings": round(float(price) * 0.1, 2)}
+            for number, price in rows
+        ])
+
+    def invoke(self, prompt):
+        super().invoke(prompt)
+        return FakeMessage(self._reply(prompt))
+
+    async def ainvoke(self, prompt):
+        await super().ainvoke(prompt)
+        return FakeMessage(self._reply(prompt))
+
+
+class FakeMongoCollection:
+    """Async writes and single-document reads of a Motor collection; each call is one simulated round-trip."""
+
+    def __init__(self, latency=0.001):
+        self.latency = latency
+        self.round_trips = 0
+        self.documents = 0
+
+    async def _round_trip(self):
+        self.round_trips += 1
+        await asyncio.sleep(self.latency)
+
+    async def insert_one(self, document, session=None):
+        await self._round_trip()
+        document.setdefault("_id", ObjectId())
+        self.documents += 1
+
+    async def insert_many(self, documents, ordered=True, session=None):
+        await self._round_trip()
+        for document in documents:
+            document.setdefault("_id", ObjectId())
+        self.documents += len(documents)
+
+    async def find_one(self, query, *args, session=None, **kwargs):
+        await self._round_trip()
+        return None
+
+    async def find_one_and_update(self, query, update, session=None, **kwargs):
+        # Nothing is stored: the "updated" document is the query plus the update's fields
+        await self._round_trip()
+        return {**query, **update.get("$set", {}), **update.get("$inc", {})}
+
+    async def update_one(self, query, update, upsert=False, session=None):
+        await self._round_trip()
+
+    async def bulk_write(self, requests, ordered=True, session=None):
+        await self._round_trip()
+
+
+class FakeMongoDatabase:
+    """Attribute access returns one FakeMongoCollection per name, like a Motor database."""
+
+    def __init__(self, latency=0.001):
+        self.latency = latency
+        self.collections = {}
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self.collections.setdefault(name, FakeMongoCollection(self.latency))
+
+    @property
+    def round_trips(self):
+        return sum(c.round_trips for c in self.collections.values())
+
+
+def _store_name(i):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return "store" + letters[i % 26] + letters[(i // 26) % 26]
+
+
+def synthetic_expenses(n_expenses):
+    """Expense documents shaped like dashboard.get_user_expenses results."""
+    expenses = []
+    for i in range(n_expenses):
+        word = EXPENSE_WORDS[i % len(EXPENSE_WORDS)]
+        qualifier = EXPENSE_WORDS[(i * 7 + 3) % len(EXPENSE_WORDS)]
+        expenses.append({
+            "amount": float(100 + (i * 37) % 900),
+            "category": "Groceries",
+            "description": f"{word} and {qualifier} from {_store_name(i % 150)}",
+        })
+    return expenses
+
+
+def synthetic_expense_summary(n_expenses):
+    """Builds the same summary string advisor_rag builds, for `n_expenses` rows."""
+    return " ".join(
+        f"Price: {e['amount']}. Category: {e['category']}. Description: {e['description']}."
+        for e in synthetic_expenses(n_expenses)
+    )
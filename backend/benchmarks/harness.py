@@ -0,0 +1,81 @@
+"""
+Runs the FastAPI app from backend.main in-process for load tests.
+
+MongoDB is replaced by mongomock-motor, or by a scratch database on a real
+server. The advice pipeline gets fake LLM/embeddings/Chroma from fakes.py, so
+nothing leaves the machine. Import this before anything that reads
+BCRYPT_ROUNDS if you want to change it.
+"""
+import uuid
+
+# Password of every user the benchmarks register
+PASSWORD = "bench-password"
+
+
+def _patch_mongomock_bulk_write():
+    # mongomock's bulk builder predates the `sort` argument that pymongo >= 4.11
+    # passes for UpdateOne; drop it so bulk_write works against the stand-in
+    import mongomock.collection
+
+    builder = mongomock.collection.BulkOperationBuilder
+    if getattr(builder.add_update, "_accepts_sort", False):
+        return
+    original = builder.add_update
+
+    def add_update(self, *args, sort=None, **kwargs):
+        return original(self, *args, **kwargs)
+
+    add_update._accepts_sort = True
+    builder.add_update = add_update
+
+
+def in_memory_database():
+    from mongomock_motor import AsyncMongoMockClient
+
+    _patch_mongomock_bulk_write()
+    return AsyncMongoMockClient().users
+
+
+def scratch_database(url: str):
+    """A fresh, uniquely named database on a real server; drop it when done."""
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    return AsyncIOMotorClient(url)[f"bench_{uuid.uuid4().hex[:12]}"]
+
+
+def use_database(db, transactions: bool = False):
+    """Points every service module that holds a database handle at `db`."""
+    from ..app import database
+    from ..app.services import advice_jobs, category_totals, dashboard, rollups, versions
+
+    database.database = dashboard.db = category_totals.db = rollups.db = versions.db = advice_jobs.db = db
+    # None lets category_totals probe a real server; the stand-in has no transactions
+    category_totals._transactions_supported = None if transactions else False
+
+
+def use_fake_advisor(llm, chroma):
+    """Makes the pipeline's lazily built clients the given fakes."""
+    from ..rag_modules import pipeline
+
+    pipeline.llm, pipeline.db = llm, chroma
+
+
+async def register_and_login(client, email: str, username: str, city: str = "Lahore", password: str = PASSWORD):
+    """Registers a user through the API and returns their bearer auth headers."""
+    await client.post("/api/user/register", json={
+        "email": email, "username": username, "city": city, "password": password,
+    })
+    token = (await client.post("/api/user/token", data={"username": email, "password": password})).json()
+    return {"Authorization": f"Bearer {token['access_token']}"}
+
+
+def percentile(values, pct):
+    """Nearest-rank `pct` percentile of `values` (in any order)."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def create_client(app):
+    import httpx
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=None)
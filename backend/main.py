@@ -1,12 +1,59 @@
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from backend.app.compression import CompressionMiddleware
+from backend.app.database import get_database
+from backend.app.indexes import bootstrap_indexes
+from backend.app.metrics import MetricsMiddleware, render as render_metrics
 from backend.app.routers import auth, dashboard, advisor_rag
+from backend.app.services import advice_jobs, rollups
+from backend.rag_modules import pipeline
 from dotenv import load_dotenv
 
 load_dotenv()
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
+
+
+def prewarm_advisor():
+    # Load LangChain and copy the product collection into memory in the background,
+    # so startup is not delayed and the first advice request skips the cold path.
+    # Set RAG_PREWARM=0 on dashboard-only workers to never load them.
+    if os.getenv("RAG_PREWARM", "1") != "1" or not os.getenv("OPENAI_API_KEY"):
+        return
+    task = asyncio.create_task(asyncio.to_thread(pipeline.prewarm))
+    task.add_done_callback(_log_prewarm_failure)
+
+
+def _log_prewarm_failure(task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning("Advisor prewarm failed: %s", task.exception())
+
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Idempotent; also logs any service query left without a supporting index
+    await bootstrap_indexes(get_database())
+    # Once per database; other workers wait for it, so /summary and write totals are complete
+    await rollups.ensure_backfilled()
+    prewarm_advisor()
+    # Run queued advice jobs (and the off-peak precompute, if ADVICE_PRECOMPUTE_AT is set)
+    advice_jobs.start_workers()
+    try:
+        yield
+    finally:
+        await advice_jobs.stop_workers()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Innermost: compresses the body the routes produced, before CORS and metrics
+app.add_middleware(CompressionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -18,13 +65,22 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let the browser devtools show the per-stage breakdown, and the app read ETags and Retry-After
+    expose_headers=["Server-Timing", "ETag", "Retry-After"],
 )
+# Outermost, so latency covers CORS handling too
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(auth.router, prefix="/api/user")
 app.include_router(dashboard.router, prefix="/api/dashboard")
 app.include_router(advisor_rag.router, prefix="/api/advisor")
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the FinanceApp API"}
@@ -1,5 +1,12 @@
 __all__ = [
+    "context",
+    "embedding_cache",
+    "executor",
+    "incremental",
+    "ingest",
     "pipeline",
+    "product_index",
+    "retrieval",
 ]
 
 
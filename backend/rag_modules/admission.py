@@ -0,0 +1,99 @@
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+
+from ..app.metrics import ADMISSION_ACTIVE, ADMISSION_REJECTED, ADMISSION_WAITING
+
+
+class Overloaded(Exception):
+    """
+    Raised instead of queueing work the controller cannot take. Carries the
+    HTTP status to answer with (429 when the queue is full, 503 when the wait
+    timed out) and a Retry-After hint in seconds.
+    """
+
+    def __init__(self, status_code: int, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    A semaphore of `max_concurrency` slots with a bounded wait: at most
+    `max_queue` callers wait, each for at most `queue_timeout` seconds, and
+    everyone beyond that is rejected at once with Overloaded rather than
+    piling up behind slow work (e.g. LLM calls). Work already admitted waits
+    outside that bound (see slot).
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        # Callers that may be shed, and admitted work (shed=False) waiting for a slot
+        self.waiting = 0
+        self.backlog = 0
+        # Moving average of how long a slot is held
+        self.hold_seconds = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @property
+    def retry_after(self) -> int:
+        # Roughly how long the current queue takes to drain, capped at the longest allowed wait
+        if self.hold_seconds is None:
+            return 1
+        drain = self.hold_seconds * (1 + self.waiting + self.backlog) / self.max_concurrency
+        return max(1, math.ceil(min(drain, self.queue_timeout)))
+
+    def check(self):
+        """Raises Overloaded if a caller arriving now would be rejected for a full queue."""
+        # Counted rather than read off the semaphore: callers admitted in the same
+        # tick have not acquired it yet, but are already counted as waiting
+        if self.active + self.waiting >= self.max_concurrency + self.max_queue:
+            ADMISSION_REJECTED.inc(self.name, "queue_full")
+            raise Overloaded(429, self.retry_after, f"{self.name} is at capacity, retry later")
+
+    def _set_waiting(self, delta: int, shed: bool):
+        if shed:
+            self.waiting += delta
+        else:
+            self.backlog += delta
+        ADMISSION_WAITING.set(self.name, value=self.waiting + self.backlog)
+
+    @asynccontextmanager
+    async def slot(self, shed: bool = True):
+        """
+        Holds one slot for the block. With shed=False the caller waits as long
+        as it takes, without counting against the queue (for work already
+        admitted, e.g. the batches of one request); callers should bound how
+        many such slots they wait for at once.
+        """
+        if shed:
+            self.check()
+        self._set_waiting(1, shed)
+        try:
+            if shed:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            else:
+                await self._semaphore.acquire()
+        except asyncio.TimeoutError:
+            ADMISSION_REJECTED.inc(self.name, "timeout")
+            raise Overloaded(503, self.retry_after, f"{self.name} is overloaded, retry later") from None
+        finally:
+            self._set_waiting(-1, shed)
+
+        self.active += 1
+        ADMISSION_ACTIVE.set(self.name, value=self.active)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            held = time.perf_counter() - start
+            self.hold_seconds = held if self.hold_seconds is None else 0.8 * self.hold_seconds + 0.2 * held
+            self.active -= 1
+            ADMISSION_ACTIVE.set(self.name, value=self.active)
+            self._semaphore.release()
@@ -0,0 +1,95 @@
+import os
+import re
+from collections import Counter
+from typing import Iterable, List, NamedTuple
+
+from .retrieval import ProductMatch, extract_terms
+
+# Token budget for the "Provided Products" section of the advice prompt
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+# Tokenizer of the advice model; used for counting only, never sent anywhere
+TOKENIZER_ENCODING = os.getenv("TOKENIZER_ENCODING", "o200k_base")
+
+# Field labels of the summary built by the advisor router, not expense content
+SUMMARY_FIELD_WORDS = {"price", "category", "description"}
+
+_APPROX_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+_encoding = None
+
+
+def _get_encoding():
+    """tiktoken encoding if it is installed and its BPE file is available, else False."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(TOKENIZER_ENCODING)
+        except Exception:
+            _encoding = False
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """
+    Counts tokens with the local tiktoken encoding, falling back to a
+    word/punctuation approximation when tiktoken is unavailable.
+    """
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text))
+    return len(_APPROX_TOKEN_PATTERN.findall(text))
+
+
+class AssembledContext(NamedTuple):
+    text: str
+    tokens: int
+    products: int
+    dropped: int
+
+
+def extract_terms_per_item(expense_text: str) -> List[str]:
+    """
+    Unique words per expense item (one item per sentence group of the summary),
+    so a word's weight is the number of items that mention it.
+    """
+    items = re.split(r"(?=Price:)", expense_text) if "Price:" in expense_text else [expense_text]
+    return [term for item in items for term in extract_terms(item)]
+
+
+def rank_matches(matches: Iterable[ProductMatch], expense_text: str) -> List[ProductMatch]:
+    """
+    Dedupes matches by document id and orders them by relevance to the expenses:
+    products sharing more words with more expense items first, then by vector distance.
+    """
+    term_weights = Counter(
+        term for term in extract_terms_per_item(expense_text) if term not in SUMMARY_FIELD_WORDS
+    )
+
+    unique = {}
+    for match in matches:
+        unique.setdefault(match.id, match)
+
+    def score(match: ProductMatch):
+        overlap = sum(term_weights.get(word, 0) for word in extract_terms(match.content))
+        closeness = 1.0 / (1.0 + match.distance) if match.distance is not None else 0.0
+        return overlap + closeness
+
+    return sorted(unique.values(), key=score, reverse=True)
+
+
+def assemble_context(matches: Iterable[ProductMatch], expense_text: str, token_budget: int = CONTEXT_TOKEN_BUDGET) -> AssembledContext:
+    """
+    Packs the most relevant unique product lines into `token_budget` tokens.
+    A budget of 0 or less disables the limit.
+    """
+    ranked = rank_matches(matches, expense_text)
+
+    lines, used = [], 0
+    for match in ranked:
+        cost = count_tokens(match.content) + 1  # newline separator
+        if token_budget > 0 and used + cost > token_budget:
+            continue
+        lines.append(match.content)
+        used += cost
+
+    return AssembledContext("\n".join(lines), used, len(lines), len(ranked) - len(lines))
@@ -0,0 +1,98 @@
+import hashlib
+import os
+from array import array
+from typing import Dict, List, Optional
+
+from .executor import run_blocking
+from .tiered_store import TieredStore
+
+# On-disk tier lives next to the Chroma persist directory
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "backend/embedding_cache.sqlite3")
+EMBEDDING_CACHE_MEMORY_ITEMS = int(os.getenv("EMBEDDING_CACHE_MEMORY_ITEMS", "4096"))
+
+
+def cache_key(model: str, text: str) -> str:
+    """Content address of an embedding: model name plus the exact text."""
+    return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class CachedEmbeddings:
+    """
+    Wraps a LangChain embedding function with an in-process LRU tier and a
+    SQLite tier keyed by model name and text hash (a TieredStore). Only texts
+    missing from both tiers are sent to the wrapped embedding function, in
+    one batch. Lookups are counted in CACHE_LOOKUPS{cache="embedding"}
+    (result hit, disk_hit or miss), shown on /metrics.
+    """
+
+    def __init__(
+        self,
+        embeddings,
+        model: Optional[str] = None,
+        path: Optional[str] = EMBEDDING_CACHE_PATH,
+        max_memory_items: int = EMBEDDING_CACHE_MEMORY_ITEMS,
+    ):
+        self.embeddings = embeddings
+        self.model = model or getattr(embeddings, "model", None) or type(embeddings).__name__
+        self.misses = 0
+        self._store = TieredStore(
+            "embedding",
+            path,
+            table="embeddings",
+            value_column="vector",
+            value_type="BLOB",
+            encode=lambda vector: array("f", vector).tobytes(),
+            decode=lambda blob: array("f", blob).tolist(),
+            max_memory_items=max_memory_items,
+            fixed={"model": self.model},
+        )
+
+    def _lookup(self, texts: List[str]):
+        """Resolves texts from the cache tiers; returns keys, found vectors and misses."""
+        keys = [cache_key(self.model, text) for text in texts]
+        vectors: Dict[str, List[float]] = self._store.get_many(keys)
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+        return keys, vectors, missing
+
+    def _store_embedded(self, missing: Dict[str, str], embedded: List[List[float]]) -> Dict[str, List[float]]:
+        fresh = dict(zip(missing.keys(), embedded))
+        self.misses += len(fresh)
+        self._store.set_many(fresh)
+        return fresh
+
+    # --- LangChain Embeddings interface ---
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, vectors, missing = self._lookup(texts)
+        if missing:
+            embedded = self.embeddings.embed_documents(list(missing.values()))
+            vectors.update(self._store_embedded(missing, embedded))
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        # The SQLite tier is blocking I/O, so both cache passes run off the event loop
+        keys, vectors, missing = await run_blocking(self._lookup, texts)
+        if missing:
+            if hasattr(self.embeddings, "aembed_documents"):
+                embedded = await self.embeddings.aembed_documents(list(missing.values()))
+            else:
+                embedded = await run_blocking(self.embeddings.embed_documents, list(missing.values()))
+            vectors.update(await run_blocking(self._store_embedded, missing, embedded))
+        return [vectors[key] for key in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters; misses are texts actually sent to the embedding API."""
+        return {
+            "memory_hits": self._store.memory_hits,
+            "disk_hits": self._store.disk_hits,
+            "misses": self.misses,
+            "memory_items": len(self._store),
+        }
@@ -0,0 +1,21 @@
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Dedicated pool for blocking RAG work (Chroma queries, SQLite, sync LLM clients),
+# so it never competes with the default executor used by the rest of the app.
+RAG_THREAD_POOL_SIZE = int(os.getenv("RAG_THREAD_POOL_SIZE", "8"))
+
+_executor = ThreadPoolExecutor(max_workers=RAG_THREAD_POOL_SIZE, thread_name_prefix="rag")
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """
+    Runs a blocking callable on the RAG thread pool and awaits its result.
+    The callable sees the caller's context variables (e.g. request metrics).
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_executor, functools.partial(context.run, fn, *args, **kwargs))
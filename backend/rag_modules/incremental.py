@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+from .retrieval import asearch_terms, extract_terms
+from .tiered_store import TieredStore
+
+# Per-item analyses are memoized on disk next to the embedding cache
+ITEM_MEMO_PATH = os.getenv("ITEM_MEMO_PATH", "backend/advice_items.sqlite3")
+ITEM_MEMO_MEMORY_ITEMS = int(os.getenv("ITEM_MEMO_MEMORY_ITEMS", "8192"))
+# Upper bound on expense items sent to the LLM in one prompt
+ITEM_BATCH_SIZE = int(os.getenv("ITEM_BATCH_SIZE", "20"))
+# Items quoted individually in the final paragraph; the total covers every item
+ITEM_SUMMARY_LIMIT = int(os.getenv("ITEM_SUMMARY_LIMIT", "8"))
+
+ITEM_TEMPLATE = """
+You are a professional financial advisor from Pakistan.
+
+For each numbered expense below, find the closest product listed under it (same category, most similar description),
+convert both to the same quantity units (grams, liters, or pieces) and compare prices for the quantity the user bought.
+If no product is listed, use realistic Pakistani market prices instead.
+
+Return ONLY a JSON array with one object per expense, in the same order:
+[{{"id": <expense number>, "advice": "<one or two sentences, e.g. You paid X PKR for Y grams, but a similar product costs Z PKR for Y grams — saving W PKR.>", "savings": <potential savings in PKR as a number, 0 if the user's price is already good>}}]
+
+Expenses:
+{items}
+"""
+
+# Changes whenever the item prompt changes, so memoized analyses from an older prompt are not reused
+ITEM_PROMPT_VERSION = hashlib.sha256(ITEM_TEMPLATE.encode("utf-8")).hexdigest()[:12]
+
+
+def _normalize_text(value) -> str:
+    return " ".join(str(value or "").split())
+
+
+def normalize_item(expense: dict) -> dict:
+    return {
+        "amount": round(float(expense.get("amount") or 0), 2),
+        "category": _normalize_text(expense.get("category")),
+        "description": _normalize_text(expense.get("description")),
+    }
+
+
+def item_key(item: dict, context: str) -> str:
+    """
+    Memo key of one expense item: its normalized fields, the products it was
+    compared against and the item prompt version.
+    """
+    raw = json.dumps(
+        [item["amount"], item["category"].lower(), item["description"].lower(), context, ITEM_PROMPT_VERSION]
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ItemAnalysisMemo:
+    """
+    Memoized per-item analyses ({"advice": str, "savings": float}): an in-process
+    LRU in front of a SQLite table keyed by item_key (a TieredStore, counted in
+    CACHE_LOOKUPS{cache="item_analysis"}).
+    """
+
+    def __init__(self, path: Optional[str] = ITEM_MEMO_PATH, max_memory_items: int = ITEM_MEMO_MEMORY_ITEMS):
+        self._store = TieredStore(
+            "item_analysis",
+            path,
+            table="item_analyses",
+            value_column="analysis",
+            value_type="TEXT",
+            encode=json.dumps,
+            decode=json.loads,
+            max_memory_items=max_memory_items,
+        )
+
+    def get_many(self, keys: List[str]) -> Dict[str, dict]:
+        return self._store.get_many(keys)
+
+    def set_many(self, analyses: Dict[str, dict]):
+        self._store.set_many(analyses)
+
+
+_memo = None
+
+
+def get_item_memo() -> ItemAnalysisMemo:
+    global _memo
+    if _memo is None:
+        _memo = ItemAnalysisMemo()
+    return _memo
+
+
+async def aretrieve_item_contexts(items: List[dict], db, index=None) -> List[str]:
+    """
+    Product context per item. All items' words go through one batched lookup;
+    each item then gets the products matched by its own words.
+    """
+    item_terms = [extract_terms(f"{item['category']} {item['description']}") for item in items]
+    all_terms = list(dict.fromkeys(term for terms in item_terms for term in terms))
+    matches = await asearch_terms(db, all_terms, top_k=1, index=index)
+
+    # search_terms keeps each product once, under the first term that found it
+    products_by_term: Dict[str, List[str]] = {}
+    for match in matches:
+        products_by_term.setdefault(match.term, []).append(match.content)
+
+    contexts = []
+    for terms in item_terms:
+        products = list(dict.fromkeys(p for term in terms for p in products_by_term.get(term, [])))
+        contexts.append("\n".join(products))
+    return contexts
+
+
+def build_item_prompt(items: List[dict], contexts: List[str]) -> str:
+    lines = []
+    for number, (item, context) in enumerate(zip(items, contexts), start=1):
+        lines.append(
+            f"{number}. Price: {item['amount']}. Category: {item['category']}. Description: {item['description']}.\n"
+            f"   Provided Products:\n   " + ("\n   ".join(context.splitlines()) if context else "(No matching product)")
+        )
+    return ITEM_TEMPLATE.format(items="\n".join(lines))
+
+
+def parse_item_analyses(text: str, count: int) -> Optional[List[dict]]:
+    """
+    Parses the LLM's JSON array; returns None when it is unusable so nothing bad is memoized.
+    """
+    start, end = text.find("["), text.rfind("]")
+    if start < 0 or end <= start:
+        return None
+    try:
+        raw = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+
+    analyses: List[Optional[dict]] = [None] * count
+    for position, entry in enumerate(raw):
+        if not isinstance(entry, dict):
+            continue
+        index = entry.get("id", position + 1)
+        try:
+            index = int(index) - 1
+            savings = max(0.0, float(entry.get("savings") or 0))
+        except (TypeError, ValueError):
+            continue
+        if 0 <= index < count:
+            analyses[index] = {"advice": str(entry.get("advice") or "").strip(), "savings": round(savings, 2)}
+    if any(a is None for a in analyses):
+        return None
+    return analyses
+
+
+def combine_item_analyses(analyses: List[dict]) -> dict:
+    """
+    Builds the final paragraph from the per-item analyses with the largest savings,
+    ending with the total potential savings over all items.
+    """
+    total = round(sum(a["savings"] for a in analyses), 2)
+    ranked = sorted((a for a in analyses if a["advice"]), key=lambda a: a["savings"], reverse=True)
+    highlights = [a["advice"] for a in ranked[:ITEM_SUMMARY_LIMIT] if a["savings"] > 0]
+
+    if highlights:
+        paragraph = " ".join(highlights)
+        paragraph += f" Altogether, these changes could save you about {total:,.0f} PKR."
+    else:
+        paragraph = "Your purchases are already competitively priced; we could not find meaningful savings this time."
+    return {"advice": paragraph, "total_savings": total}
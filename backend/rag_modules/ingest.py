@@ -0,0 +1,259 @@
+"""
+Bulk ingestion of a product price list into the pakistan_products collection.
+
+Usage, from the repository root:
+
+    python -m backend.rag_modules.ingest prices.csv [--batch-size 1000]
+
+Accepts CSV (header row), JSON Lines or a .json array of objects. Recognised
+columns: name (or product), price, quantity (e.g. "1000g", "1.5 l", "12 pcs")
+or quantity + unit, and optional id/sku, store and category. Rows are upserted by a stable product id;
+rows whose content did not change since the last run are skipped. Rows that
+fail validation, including JSON Lines that do not parse to an object, are
+counted as invalid and skipped.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import re
+import sys
+import time
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Unit aliases -> (base unit, factor to base unit)
+UNITS = {
+    "mg": ("g", 0.001), "g": ("g", 1.0), "gm": ("g", 1.0), "gms": ("g", 1.0), "gram": ("g", 1.0),
+    "grams": ("g", 1.0), "kg": ("g", 1000.0), "kgs": ("g", 1000.0), "kilogram": ("g", 1000.0),
+    "ml": ("ml", 1.0), "l": ("ml", 1000.0), "ltr": ("ml", 1000.0), "liter": ("ml", 1000.0),
+    "liters": ("ml", 1000.0), "litre": ("ml", 1000.0), "litres": ("ml", 1000.0),
+    "pc": ("pcs", 1.0), "pcs": ("pcs", 1.0), "piece": ("pcs", 1.0), "pieces": ("pcs", 1.0),
+    "pack": ("pcs", 1.0), "dozen": ("pcs", 12.0),
+}
+# Unit prices are quoted per kg / per litre / per piece
+PRICE_UNITS = {"g": (1000.0, "kg"), "ml": (1000.0, "l"), "pcs": (1.0, "pc")}
+
+_QUANTITY_PATTERN = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([a-zA-Z]+)\s*$")
+
+
+class IngestError(ValueError):
+    pass
+
+
+class Product(NamedTuple):
+    id: str
+    document: str
+    metadata: Dict[str, object]
+
+
+class IngestStats(NamedTuple):
+    rows: int
+    invalid: int
+    unchanged: int
+    upserted: int
+    seconds: float
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def parse_quantity(quantity: str, unit: Optional[str] = None) -> Tuple[float, str]:
+    """
+    Parses "1000g" / "1.5 liter" / ("12", "pcs") into (amount in base unit, base unit).
+    """
+    text = f"{quantity} {unit}" if unit else str(quantity)
+    match = _QUANTITY_PATTERN.match(text)
+    if not match:
+        raise IngestError(f"unrecognised quantity {text!r}")
+    value, alias = float(match.group(1)), match.group(2).lower()
+    if alias not in UNITS:
+        raise IngestError(f"unknown unit {alias!r}")
+    base_unit, factor = UNITS[alias]
+    if value <= 0:
+        raise IngestError(f"quantity must be positive, got {text!r}")
+    return value * factor, base_unit
+
+
+def _format_quantity(amount: float, base_unit: str) -> str:
+    if base_unit == "g":
+        return f"{amount / 1000:g}kg" if amount >= 1000 else f"{amount:g}g"
+    if base_unit == "ml":
+        return f"{amount / 1000:g} liter" if amount >= 1000 else f"{amount:g}ml"
+    return f"{amount:g} pcs"
+
+
+def _first(row: dict, *names):
+    for name in names:
+        value = row.get(name)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def normalize_row(row: dict) -> Product:
+    """
+    Validates one price row and returns the document and metadata to store.
+    The document keeps the "Name, quantity, price PKR" shape the advice prompt expects.
+    `row` may also be the IngestError iter_rows yields for an unreadable line.
+    """
+    if isinstance(row, IngestError):
+        raise row
+    if not isinstance(row, dict):
+        raise IngestError(f"expected an object, got {type(row).__name__}")
+    name = " ".join(str(_first(row, "name", "product", "title") or "").split())
+    if not name:
+        raise IngestError("missing product name")
+    try:
+        price = float(str(_first(row, "price", "price_pkr")).replace(",", ""))
+    except (TypeError, ValueError):
+        raise IngestError(f"invalid price {row.get('price')!r}")
+    if price < 0:
+        raise IngestError(f"negative price {price}")
+
+    quantity = _first(row, "quantity", "size", "weight")
+    if quantity is None:
+        raise IngestError("missing quantity")
+    amount, base_unit = parse_quantity(quantity, _first(row, "unit"))
+
+    store = " ".join(str(_first(row, "store", "brand") or "").split())
+    category = " ".join(str(_first(row, "category") or "").split())
+    scale, price_unit = PRICE_UNITS[base_unit]
+    unit_price = round(price / amount * scale, 2)
+    quantity_label = _format_quantity(amount, base_unit)
+
+    product_id = _first(row, "id", "sku")
+    if product_id is None:
+        identity = "|".join([name.lower(), store.lower(), f"{amount:g}{base_unit}"])
+        product_id = hashlib.sha1(identity.encode("utf-8")).hexdigest()[:20]
+
+    document = f"{name}, {quantity_label}, {price:g} PKR ({unit_price:g} PKR per {price_unit})"
+    metadata = {
+        "name": name,
+        "price": price,
+        "quantity": amount,
+        "unit": base_unit,
+        "unit_price": unit_price,
+        "price_unit": price_unit,
+        "store": store,
+        "category": category,
+    }
+    metadata["content_hash"] = hashlib.sha1(
+        (document + json.dumps(metadata, sort_keys=True)).encode("utf-8")
+    ).hexdigest()
+    return Product(str(product_id), document, metadata)
+
+
+def iter_rows(path: str) -> Iterator[dict]:
+    """
+    Streams rows from a CSV or JSON Lines file without loading it whole. A
+    JSON Lines line that does not parse is yielded as an IngestError so it is
+    counted as an invalid row. A .json file must hold one array of objects
+    and is loaded whole; use JSON Lines for large lists.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".json"):
+            try:
+                rows = json.load(f)
+            except ValueError as e:
+                raise IngestError(f"{path} is not valid JSON: {e}")
+            if not isinstance(rows, list):
+                raise IngestError(f"{path} must contain a JSON array of objects; use .jsonl for JSON Lines")
+            yield from rows
+        elif path.endswith((".jsonl", ".ndjson")):
+            for number, line in enumerate(f, start=1):
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError as e:
+                        yield IngestError(f"line {number} is not valid JSON: {e}")
+        else:
+            yield from csv.DictReader(f)
+
+
+def _batches(items: Iterable, size: int) -> Iterator[List]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def ingest_rows(rows: Iterable[dict], collection, embeddings, batch_size: int = DEFAULT_BATCH_SIZE, log=print) -> IngestStats:
+    """
+    Normalizes, embeds and upserts rows into a Chroma collection in batches.
+    Per batch: one `get` to find unchanged products, one embedding call for the
+    changed ones and one `upsert`.
+    """
+    start = time.perf_counter()
+    total = invalid = unchanged = upserted = 0
+
+    for batch_number, batch in enumerate(_batches(rows, batch_size), start=1):
+        products: Dict[str, Product] = {}
+        for row in batch:
+            total += 1
+            try:
+                product = normalize_row(row)
+            except IngestError as e:
+                invalid += 1
+                if invalid <= 10:
+                    log(f"row {total}: skipped ({e})")
+                continue
+            products[product.id] = product  # a later duplicate row wins
+
+        if not products:
+            continue
+
+        existing = collection.get(ids=list(products), include=["metadatas"])
+        for product_id, metadata in zip(existing["ids"], existing["metadatas"]):
+            if (metadata or {}).get("content_hash") == products[product_id].metadata["content_hash"]:
+                del products[product_id]
+                unchanged += 1
+
+        if products:
+            changed = list(products.values())
+            vectors = embeddings.embed_documents([p.document for p in changed])
+            collection.upsert(
+                ids=[p.id for p in changed],
+                embeddings=vectors,
+                documents=[p.document for p in changed],
+                metadatas=[p.metadata for p in changed],
+            )
+            upserted += len(changed)
+
+        elapsed = time.perf_counter() - start
+        log(f"batch {batch_number}: {total} rows, {upserted} upserted, {unchanged} unchanged, "
+            f"{invalid} invalid, {total / elapsed:,.0f} rows/sec")
+
+    return IngestStats(total, invalid, unchanged, upserted, time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load a product price list into the vector DB.")
+    parser.add_argument("path", help="CSV, JSON Lines or JSON array price list")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    from . import pipeline
+
+    _, db = pipeline.ensure_resources()
+    # Batches go through the embedding cache, so re-ingesting known products costs nothing
+    try:
+        stats = ingest_rows(iter_rows(args.path), db._collection, db.embeddings, batch_size=args.batch_size)
+    except IngestError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(
+        f"Done: {stats.rows} rows in {stats.seconds:.1f}s ({stats.rows_per_second:,.0f} rows/sec): "
+        f"{stats.upserted} upserted, {stats.unchanged} unchanged, {stats.invalid} invalid."
+    )
+    return 0 if stats.rows > stats.invalid or not stats.rows else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,67 +1,144 @@
+import asyncio
+import hashlib
+import json
+import logging
 import os
-import re
+import threading
 from dotenv import load_dotenv
-from langchain.prompts import PromptTemplate
-from langchain.chains import LLMChain
+
+from ..app.metrics import PROMPT_TOKENS, span
+from .admission import AdmissionController
+from .context import CONTEXT_TOKEN_BUDGET, assemble_context, count_tokens
+from .embedding_cache import CachedEmbeddings
+from .executor import run_blocking
+from .product_index import get_product_index
+from .incremental import (
+    ITEM_BATCH_SIZE,
+    aretrieve_item_contexts,
+    build_item_prompt,
+    combine_item_analyses,
+    get_item_memo,
+    item_key,
+    normalize_item,
+    parse_item_analyses,
+)
+from .retrieval import asearch_terms, extract_terms, search_terms
 
 # Load environment variables from the .env file at the project root
 load_dotenv()
 
-# Lazily initialized globals to avoid import-time failures
-llm = None
-db = None
+logger = logging.getLogger(__name__)
 
-# Vector DB constants
+# Vector DB setup
 VECTOR_DB_PATH = 'backend/vectorDB'
 COLLECTION_NAME = 'pakistan_products'
+CHROMA_SQLITE_PATH = os.path.join(VECTOR_DB_PATH, 'chroma.sqlite3')
+# Serve product lookups from an in-process copy of the collection instead of Chroma
+PRODUCT_INDEX_ENABLED = os.getenv("PRODUCT_INDEX_ENABLED", "1") == "1"
+
+# LangChain, the OpenAI clients and Chroma are imported and built on first use
+# (see ensure_resources), so importing this module is cheap and needs no API key.
+llm = None
+db = None
+# Expense words and queries repeat across requests, so embeddings are cached
+# in memory and on disk; warm requests never reach the embedding API.
+embedding_cache = None
+_resources_lock = threading.Lock()
+
 
 def ensure_resources():
     """Initialize LLM and Vector DB if needed, using environment variables.
     Raises a descriptive error if OPENAI_API_KEY is missing.
     """
-    global llm, db
+    global llm, db, embedding_cache
     if llm is not None and db is not None:
         return llm, db
 
-    from langchain_community.vectorstores import Chroma
-    from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+    with _resources_lock:
+        if llm is not None and db is not None:
+            return llm, db
+
+        openai_api_key = os.getenv("OPENAI_API_KEY")
+        if not openai_api_key:
+            raise RuntimeError("OPENAI_API_KEY is not set. Add it to a .env file or environment.")
+
+        from langchain_community.vectorstores import Chroma
+        from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+        logger.info("Loading ChromaDB from %s...", VECTOR_DB_PATH)
+        embedding_cache = CachedEmbeddings(OpenAIEmbeddings(openai_api_key=openai_api_key))
+        db = Chroma(
+            persist_directory=VECTOR_DB_PATH,
+            embedding_function=embedding_cache,
+            collection_name=COLLECTION_NAME,
+        )
+        llm = ChatOpenAI(model_name="gpt-4o", temperature=0.7, openai_api_key=openai_api_key)
+        return llm, db
 
-    openai_api_key = os.getenv("OPENAI_API_KEY")
-    if not openai_api_key:
-        raise RuntimeError("OPENAI_API_KEY is not set. Add it to a .env file or environment.")
 
-    llm = ChatOpenAI(model_name="gpt-4o", temperature=0.7, openai_api_key=openai_api_key)
-    db = Chroma(
-        persist_directory=VECTOR_DB_PATH,
-        embedding_function=OpenAIEmbeddings(openai_api_key=openai_api_key),
-        collection_name=COLLECTION_NAME,
-    )
-    return llm, db
+def prewarm():
+    """
+    Loads LangChain, the clients and the product index ahead of the first
+    advice request. Safe to call from a background thread.
+    """
+    ensure_resources()
+    load_product_index()
+
+def get_embedding_cache_stats():
+    """Hit/miss counters of the embedding cache, empty before first use."""
+    return embedding_cache.stats() if embedding_cache is not None else {}
+
+def load_product_index(_db=None):
+    """
+    Returns the local product index for `_db` (default: the shared vector DB),
+    loading or refreshing it if chroma.sqlite3 changed. None when disabled.
+    """
+    if not PRODUCT_INDEX_ENABLED:
+        return None
+    if _db is None:
+        _, _db = ensure_resources()
+    return get_product_index(_db, CHROMA_SQLITE_PATH)
+
+
+async def _aproduct_index(_db):
+    if not PRODUCT_INDEX_ENABLED or getattr(_db, "_collection", None) is None:
+        return None
+    # Fresh index: no thread hop. Missing or stale: rebuild off the event loop.
+    index = get_product_index(_db, CHROMA_SQLITE_PATH, rebuild=False)
+    if index is None:
+        index = await run_blocking(load_product_index, _db)
+    return index
 
 # --- Exact Word Search Helper ---
-def get_matching_products(expense_text, db, top_k=1):
+def get_matching_products(expense_text, db, top_k=1, token_budget=CONTEXT_TOKEN_BUDGET):
     """
-    Search the vector DB for exact keyword matches based on words from the user's expense.
-    Returns concatenated context string of matches.
+    Search the vector DB for keyword matches based on words from the user's expense.
+    All unique words are embedded in a single batch and looked up with one
+    multi-vector query; products matched by several words are kept once.
+    Returns the most relevant matches, packed into `token_budget` tokens, as
+    a concatenated context string.
     """
-    matches = []
-    words = re.findall(r"[A-Za-z]+", expense_text.lower())
+    matches = search_terms(db, extract_terms(expense_text), top_k=top_k, index=load_product_index(db))
+    assembled = assemble_context(matches, expense_text, token_budget)
+    _log_context(assembled, token_budget)
+    return assembled.text
+
+
+def _log_context(assembled, token_budget):
+    # Counted while packing the context, so recording it costs no tokenization
+    PROMPT_TOKENS.observe(assembled.tokens, "context")
+    logger.debug(
+        "Advice context: %d products, %d tokens (budget %d), %d dropped",
+        assembled.products, assembled.tokens, token_budget, assembled.dropped,
+    )
 
-    seen = set()
-    for word in words:
-        if word not in seen:
-            seen.add(word)
-            res = db.similarity_search(word, k=top_k)
-            if res:
-                matches.extend(res)
 
-    return "\n".join([doc.page_content for doc in matches])
+async def _record_question_tokens(user_expenses_summary):
+    # The only part of the prompt not tokenized elsewhere
+    PROMPT_TOKENS.observe(await run_blocking(count_tokens, user_expenses_summary), "question")
 
 # --- Financial Advice Generator ---
-def generate_financial_advice(user_expenses_summary, llm, db):
-    context = get_matching_products(user_expenses_summary, db, top_k=1)
-
-    custom_template = """
+ADVICE_TEMPLATE = """
 You are a professional financial advisor from Pakistan.
 
 Your goal is to give realistic, human-like money-saving advice using ONLY the provided product data when it exists, 
@@ -115,135 +192,187 @@ Provided Products:
 Now, strictly follow the steps above and provide your advice:
 """
 
-    CUSTOM_PROMPT = PromptTemplate(
-        template=custom_template,
-        input_variables=["context", "question"]
-    )
-
-    chain = LLMChain(llm=llm, prompt=CUSTOM_PROMPT)
-    advice = chain.run(context=context if context else "(No matching product)", question=user_expenses_summary)
-
-    return advice
-
-import os
-import re
-from dotenv import load_dotenv
-
-# LangChain Imports
-from langchain_community.vectorstores import Chroma
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-# Defer heavy imports to runtime to avoid boot errors when optional deps are missing
-
-# Load environment variables from the .env file at the project root
-load_dotenv()
-
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise ValueError("OPENAI_API_KEY environment variable not set.")
-
-# LLM setup
-llm = ChatOpenAI(model_name="gpt-4o", temperature=0.7, openai_api_key=OPENAI_API_KEY)
-
-# Vector DB setup
-VECTOR_DB_PATH = 'backend/vectorDB'
-COLLECTION_NAME = 'pakistan_products'
-
-print(f"Loading ChromaDB from {VECTOR_DB_PATH}...")
-db = Chroma(
-    persist_directory=VECTOR_DB_PATH,
-    embedding_function=OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY),
-    collection_name=COLLECTION_NAME
+NO_MATCH_CONTEXT = "(No matching product)"
+
+# Changes whenever the prompt text changes, so cached advice from an older prompt is never served
+PROMPT_VERSION = hashlib.sha256(ADVICE_TEMPLATE.encode("utf-8")).hexdigest()[:12]
+
+# Upper bound on LLM calls running at once in this worker; beyond it at most
+# ADVICE_MAX_QUEUE requests wait, each up to ADVICE_QUEUE_TIMEOUT seconds,
+# and the rest are turned away (see admission.Overloaded)
+ADVICE_MAX_CONCURRENCY = int(os.getenv("ADVICE_MAX_CONCURRENCY", "4"))
+ADVICE_MAX_QUEUE = int(os.getenv("ADVICE_MAX_QUEUE", "16"))
+ADVICE_QUEUE_TIMEOUT = float(os.getenv("ADVICE_QUEUE_TIMEOUT", "20"))
+advice_admission = AdmissionController("advice", ADVICE_MAX_CONCURRENCY, ADVICE_MAX_QUEUE, ADVICE_QUEUE_TIMEOUT)
+
+# Retrieval (embeddings and vector search) is bounded separately: it runs before
+# the advice cache can be consulted, so it must not hold an LLM slot
+RETRIEVAL_MAX_CONCURRENCY = int(os.getenv("RETRIEVAL_MAX_CONCURRENCY", "16"))
+RETRIEVAL_MAX_QUEUE = int(os.getenv("RETRIEVAL_MAX_QUEUE", "64"))
+RETRIEVAL_QUEUE_TIMEOUT = float(os.getenv("RETRIEVAL_QUEUE_TIMEOUT", "10"))
+retrieval_admission = AdmissionController(
+    "retrieval", RETRIEVAL_MAX_CONCURRENCY, RETRIEVAL_MAX_QUEUE, RETRIEVAL_QUEUE_TIMEOUT
 )
-print("Successfully loaded collection.")
 
-# --- Exact Word Search Helper ---
-def get_matching_products(expense_text, db, top_k=1):
-    """
-    Search the vector DB for exact keyword matches based on words from the user's expense.
-    Returns concatenated context string of matches.
-    """
-    matches = []
-    words = re.findall(r"[A-Za-z]+", expense_text.lower())
 
-    seen = set()
-    for word in words:
-        if word not in seen:
-            seen.add(word)
-            res = db.similarity_search(word, k=top_k)
-            if res:
-                matches.extend(res)
+def build_advice_prompt():
+    from langchain.prompts import PromptTemplate
+    return PromptTemplate(
+        template=ADVICE_TEMPLATE,
+        input_variables=["context", "question"]
+    )
 
-    return "\n".join([doc.page_content for doc in matches])
 
-# --- Financial Advice Generator ---
 def generate_financial_advice(user_expenses_summary, _llm=None, _db=None):
     # Local imports to avoid module import-time failures
-    from langchain.prompts import PromptTemplate
     from langchain.chains import LLMChain
     # Lazy init
     _llm, _db = ensure_resources()
     context = get_matching_products(user_expenses_summary, _db, top_k=1)
 
-    custom_template = """
-You are a professional financial advisor from Pakistan.
+    chain = LLMChain(llm=_llm, prompt=build_advice_prompt())
+    advice = chain.run(context=context if context else NO_MATCH_CONTEXT, question=user_expenses_summary)
 
-Your goal is to give realistic, human-like money-saving advice using ONLY the provided product data when it exists, 
-and only fall back to market/web knowledge if no match is found.
+    return advice
 
-Your answer must be one continuous conversational paragraph, not a bullet list.
 
----
-FEW-SHOT EXAMPLES
+async def aget_matching_products(expense_text, db, top_k=1, token_budget=CONTEXT_TOKEN_BUDGET):
+    """
+    Async variant of get_matching_products; Chroma and token counting run on the RAG thread pool.
+    """
+    index = await _aproduct_index(db)
+    matches = await asearch_terms(db, extract_terms(expense_text), top_k=top_k, index=index)
+    assembled = await run_blocking(assemble_context, matches, expense_text, token_budget)
+    _log_context(assembled, token_budget)
+    return assembled.text
 
-Example 1 (MATCH FOUND):
-User's Expenses:
-Rice, 1000g, 400 PKR
 
-Provided Products:
-Basmati Rice, 1000g, 300 PKR
+async def _aresources(_llm=None, _db=None):
+    """Fills in whichever of the LLM and vector DB was not passed explicitly."""
+    if _llm is None or _db is None:
+        default_llm, default_db = await run_blocking(ensure_resources)
+        _llm = default_llm if _llm is None else _llm
+        _db = default_db if _db is None else _db
+    return _llm, _db
 
-Expected Response:
-You paid 400 PKR for 1000 grams of rice, but a similar product in our records costs 300 PKR for the same weight — meaning you overpaid by 100 PKR. Opting for the cheaper option could help you save without compromising quality.
 
-Example 2 (NO MATCH — FALLBACK):
-User's Expenses:
-Mango Juice, 1 liter, 250 PKR
+async def _ainvoke(_llm, prompt):
+    with span("llm"):
+        if hasattr(_llm, "ainvoke"):
+            message = await _llm.ainvoke(prompt)
+        else:
+            message = await run_blocking(_llm.invoke, prompt)
+    return getattr(message, "content", message)
 
-Provided Products:
-(No matching product)
 
-Expected Response:
-In the Pakistani market, good quality mango juice typically sells for around 200 PKR per liter. By choosing a more competitively priced brand, you could potentially save about 50 PKR while still enjoying a refreshing drink.
+async def aretrieve_context(user_expenses_summary, _db=None):
+    """
+    Retrieves the product context for an expense summary, as fed to the prompt.
+    Runs in a retrieval_admission slot (may raise admission.Overloaded).
+    """
+    if _db is None:
+        _, _db = await _aresources()
+    async with retrieval_admission.slot():
+        with span("retrieval"):
+            context = await aget_matching_products(user_expenses_summary, _db, top_k=1)
+    return context if context else NO_MATCH_CONTEXT
 
----
-STEPS FOR YOUR RESPONSE:
-1. Identify Match: For each item in the user's expenses, look for the closest product in "Provided Products" that matches the same category and is most similar in description.
-2. Quantity Matching: Convert both user quantity and provided product quantity into the same units (grams, liters, or pieces) before comparison.
-3. Direct Price Comparison:
-   - If a matching product exists in "Provided Products", use its price and quantity ONLY for the comparison.
-   - Calculate the price for the same quantity as the user bought, then show:
-     “You paid X PKR for Y grams, but a similar product costs Z PKR for Y grams — saving W PKR.”
-   - If the user's item is cheaper, praise their choice and state no savings.
-4. Fallback to Market Knowledge: If no match exists in "Provided Products", then and only then use Pakistani market knowledge or web search to suggest a realistic alternative.
-5. Single Response: Write a single, professional, and encouraging message combining all items’ analysis.
-6. Savings Summary: End with the total potential savings in PKR.
 
----
-User's Expenses:
-{question}
+async def agenerate_financial_advice(user_expenses_summary, _llm=None, _db=None, context=None):
+    """
+    Non-blocking generate_financial_advice for use inside request handlers.
+    At most ADVICE_MAX_CONCURRENCY generations run at once; the rest wait in
+    a bounded queue or are rejected with admission.Overloaded.
+    Pass `context` to reuse an already retrieved product context.
+    """
+    async with advice_admission.slot():
+        _llm, _db = await _aresources(_llm, _db)
+        if context is None:
+            context = await aretrieve_context(user_expenses_summary, _db)
 
-Provided Products:
-{context}
+        prompt = build_advice_prompt().format(context=context, question=user_expenses_summary)
+        await _record_question_tokens(user_expenses_summary)
+        return await _ainvoke(_llm, prompt)
 
-Now, strictly follow the steps above and provide your advice:
-"""
 
-    CUSTOM_PROMPT = PromptTemplate(
-        template=custom_template,
-        input_variables=["context", "question"]
-    )
+async def astream_financial_advice(user_expenses_summary, _llm=None, _db=None, context=None):
+    """
+    Streaming variant of agenerate_financial_advice: yields advice text chunks
+    as the LLM produces them, so the first words arrive right after retrieval.
+    """
+    async with advice_admission.slot():
+        _llm, _db = await _aresources(_llm, _db)
+        if context is None:
+            context = await aretrieve_context(user_expenses_summary, _db)
 
-    chain = LLMChain(llm=_llm, prompt=CUSTOM_PROMPT)
-    advice = chain.run(context=context if context else "(No matching product)", question=user_expenses_summary)
+        prompt = build_advice_prompt().format(context=context, question=user_expenses_summary)
+        await _record_question_tokens(user_expenses_summary)
+        with span("llm"):
+            async for chunk in _llm.astream(prompt):
+                text = getattr(chunk, "content", chunk)
+                if text:
+                    yield text
 
-    return advice
+
+async def _analyze_item_batch(_llm, items, contexts, limit):
+    # Batches of an admitted request wait their turn rather than fail the request halfway;
+    # `limit` keeps one request from queueing all of its batches ahead of everyone else
+    async with limit, advice_admission.slot(shed=False):
+        text = await _ainvoke(_llm, build_item_prompt(items, contexts))
+    return parse_item_analyses(text, len(items))
+
+
+async def agenerate_incremental_advice(user_expenses, _llm=None, _db=None, memo=None):
+    """
+    Incremental advice over expense documents: each distinct item (amount, category,
+    description) is analyzed once and memoized, so only new or changed items reach
+    the LLM, at most ITEM_BATCH_SIZE per prompt. The final paragraph and total
+    savings are assembled from the per-item results.
+    Retrieval runs in a retrieval_admission slot; only a request with items
+    left for the LLM is checked against advice_admission (and may be rejected
+    with admission.Overloaded) before its batches are queued.
+    """
+    _llm, _db = await _aresources(_llm, _db)
+    memo = memo or get_item_memo()
+
+    items = [normalize_item(expense) for expense in user_expenses]
+    identities = [json.dumps(item, sort_keys=True) for item in items]
+    distinct = list(dict(zip(identities, items)).values())
+    async with retrieval_admission.slot():
+        with span("retrieval"):
+            contexts = await aretrieve_item_contexts(distinct, _db, index=await _aproduct_index(_db))
+    keys = [item_key(item, context) for item, context in zip(distinct, contexts)]
+    key_by_identity = dict(zip(dict.fromkeys(identities), keys))
+
+    known = await run_blocking(memo.get_many, keys)
+    pending = [n for n, key in enumerate(keys) if key not in known]
+    batches = [pending[start:start + ITEM_BATCH_SIZE] for start in range(0, len(pending), ITEM_BATCH_SIZE)]
+    if batches:
+        advice_admission.check()
+    limit = asyncio.Semaphore(ADVICE_MAX_CONCURRENCY)
+    results = await asyncio.gather(*(
+        _analyze_item_batch(_llm, [distinct[n] for n in batch], [contexts[n] for n in batch], limit)
+        for batch in batches
+    ))
+
+    fresh = {}
+    for batch, analyses in zip(batches, results):
+        if analyses is None:
+            # Unparseable reply: leave these items out now and retry them next request
+            continue
+        for n, analysis in zip(batch, analyses):
+            fresh[keys[n]] = analysis
+    await run_blocking(memo.set_many, fresh)
+    known.update(fresh)
+
+    # Repeated purchases of the same item each count towards the total
+    item_keys = [key_by_identity[identity] for identity in identities]
+    analyses = [known[key] for key in item_keys if key in known]
+    result = combine_item_analyses(analyses)
+    result.update({
+        "items_total": len(distinct),
+        "items_cached": len(distinct) - len(pending),
+        "items_analyzed": len(fresh),
+        "items_failed": len(pending) - len(fresh),
+    })
+    return result
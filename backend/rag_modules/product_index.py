@@ -0,0 +1,115 @@
+import os
+import threading
+from typing import Dict, List, Optional
+
+from .retrieval import extract_terms
+
+
+def _numpy():
+    import numpy as np
+    return np
+
+
+class ProductIndex:
+    """
+    In-process copy of the product collection: a float32 matrix of normalized
+    embeddings for vector queries plus a token inverted index for exact words.
+    Answers lookups without Chroma or any network call.
+    """
+
+    def __init__(self, ids: List[str], documents: List[str], embeddings, source=None):
+        np = _numpy()
+        self.ids = list(ids)
+        self.documents = [doc or "" for doc in documents]
+        self.source = source
+
+        matrix = np.asarray(embeddings, dtype=np.float32) if self.ids else np.zeros((0, 0), dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.matrix = matrix / norms
+
+        # token -> rows, shortest documents first so the most specific product wins
+        self.postings: Dict[str, List[int]] = {}
+        for row, document in enumerate(self.documents):
+            for token in extract_terms(document):
+                self.postings.setdefault(token, []).append(row)
+        lengths = [len(doc) for doc in self.documents]
+        for rows in self.postings.values():
+            rows.sort(key=lengths.__getitem__)
+
+    @classmethod
+    def from_collection(cls, collection, source=None) -> "ProductIndex":
+        data = collection.get(include=["embeddings", "documents"])
+        embeddings = data.get("embeddings")
+        if embeddings is None:
+            embeddings = []
+        return cls(data["ids"], data["documents"], embeddings, source=source)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def lexical(self, term: str, top_k: int = 1):
+        """Products containing the exact word, as (id, document, distance=0.0)."""
+        return [(self.ids[row], self.documents[row], 0.0) for row in self.postings.get(term, [])[:top_k]]
+
+    def query(self, embeddings, top_k: int = 1):
+        """
+        Nearest products per query vector, as lists of (id, document, distance).
+        Distances are squared L2 between unit vectors, matching Chroma's "l2" space.
+        """
+        np = _numpy()
+        if not len(self.ids) or not len(embeddings):
+            return [[] for _ in embeddings]
+
+        queries = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        distances = 2.0 - 2.0 * (queries / norms) @ self.matrix.T
+
+        k = min(top_k, len(self.ids))
+        if k < len(self.ids):
+            candidates = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.tile(np.arange(len(self.ids)), (len(queries), 1))
+
+        results = []
+        for row, cols in enumerate(candidates):
+            ordered = cols[np.argsort(distances[row, cols])]
+            results.append([(self.ids[c], self.documents[c], float(distances[row, c])) for c in ordered])
+        return results
+
+
+_index: Optional[ProductIndex] = None
+_index_lock = threading.Lock()
+
+
+def _source_mtime(sqlite_path: str) -> Optional[float]:
+    try:
+        return os.path.getmtime(sqlite_path)
+    except OSError:
+        return None
+
+
+def get_product_index(db, sqlite_path: str, rebuild: bool = True) -> Optional[ProductIndex]:
+    """
+    Returns the process-wide product index for the Chroma collection behind `db`,
+    reloading it whenever `sqlite_path` has a new mtime. With `rebuild=False`
+    a stale or missing index yields None instead of a (blocking) reload. A
+    vector store without a Chroma collection has no index either (None), and
+    is searched through retrieval.query_collection.
+    """
+    global _index
+    collection = getattr(db, "_collection", None)
+    if collection is None:
+        return None
+    source = (id(collection), _source_mtime(sqlite_path))
+    index = _index
+    if index is not None and index.source == source:
+        return index
+    if not rebuild:
+        return None
+
+    with _index_lock:
+        if _index is None or _index.source != source:
+            _index = ProductIndex.from_collection(collection, source=source)
+        return _index
@@ -0,0 +1,139 @@
+import re
+from typing import List, NamedTuple, Optional
+
+from ..app.metrics import span
+from .executor import run_blocking
+
+WORD_PATTERN = re.compile(r"[A-Za-z]+")
+
+
+class ProductMatch(NamedTuple):
+    """A product document returned by the vector DB for one search term."""
+    id: str
+    content: str
+    distance: Optional[float]
+    term: str
+
+
+def extract_terms(text: str) -> List[str]:
+    """
+    Returns the unique lowercase words of the text, in first-seen order.
+    """
+    return list(dict.fromkeys(WORD_PATTERN.findall(text.lower())))
+
+
+def embed_terms(db, terms: List[str]) -> List[List[float]]:
+    """
+    Embeds all terms with the vector DB's embedding function in one batch call.
+    """
+    with span("embedding"):
+        return db.embeddings.embed_documents(terms)
+
+
+async def aembed_terms(db, terms: List[str]) -> List[List[float]]:
+    """
+    Async variant of embed_terms; falls back to the RAG thread pool for
+    embedding functions without a native async API.
+    """
+    embeddings = db.embeddings
+    with span("embedding"):
+        if hasattr(embeddings, "aembed_documents"):
+            return await embeddings.aembed_documents(terms)
+        return await run_blocking(embeddings.embed_documents, terms)
+
+
+def query_collection(db, embeddings: List[List[float]], top_k: int = 1):
+    """
+    Runs a single multi-vector query against the Chroma collection behind `db`.
+    Returns per-embedding lists of (id, document, distance).
+    """
+    collection = getattr(db, "_collection", None)
+    if collection is None:
+        # Generic LangChain vector store: one lookup per vector, still no re-embedding
+        return [
+            [(doc.metadata.get("id", doc.page_content), doc.page_content, None)
+             for doc in db.similarity_search_by_vector(embedding, k=top_k)]
+            for embedding in embeddings
+        ]
+
+    result = collection.query(
+        query_embeddings=embeddings,
+        n_results=top_k,
+        include=["documents", "distances"],
+    )
+    return [
+        list(zip(ids, documents, distances))
+        for ids, documents, distances in zip(result["ids"], result["documents"], result["distances"])
+    ]
+
+
+def split_lexical(index, terms: List[str], top_k: int = 1):
+    """
+    Resolves terms that appear verbatim in some product from the local index.
+    Returns {term: hits} for those and the terms that still need a vector lookup.
+    """
+    if index is None:
+        return {}, list(terms)
+    hits, remaining = {}, []
+    for term in terms:
+        lexical = index.lexical(term, top_k)
+        if lexical:
+            hits[term] = lexical
+        else:
+            remaining.append(term)
+    return hits, remaining
+
+
+def search_terms(db, terms: List[str], top_k: int = 1, index=None) -> List[ProductMatch]:
+    """
+    Looks up every term in the vector DB with one embedding batch and one query.
+    Products matched by more than one term are only returned for the first term.
+    With a local ProductIndex, exact word matches skip embedding entirely and the
+    remaining vector queries are answered in-process instead of by Chroma.
+    """
+    if not terms:
+        return []
+
+    hits, remaining = split_lexical(index, terms, top_k)
+    if remaining:
+        embeddings = embed_terms(db, remaining)
+        if index is not None:
+            vector_hits = index.query(embeddings, top_k)
+        else:
+            vector_hits = query_collection(db, embeddings, top_k=top_k)
+        hits.update(zip(remaining, vector_hits))
+    return collect_matches(terms, [hits[term] for term in terms])
+
+
+async def asearch_terms(db, terms: List[str], top_k: int = 1, index=None) -> List[ProductMatch]:
+    """
+    Async variant of search_terms; a Chroma query runs on the RAG thread pool,
+    local index lookups run inline.
+    """
+    if not terms:
+        return []
+
+    hits, remaining = split_lexical(index, terms, top_k)
+    if remaining:
+        embeddings = await aembed_terms(db, remaining)
+        if index is not None:
+            vector_hits = index.query(embeddings, top_k)
+        else:
+            vector_hits = await run_blocking(query_collection, db, embeddings, top_k=top_k)
+        hits.update(zip(remaining, vector_hits))
+    return collect_matches(terms, [hits[term] for term in terms])
+
+
+def collect_matches(terms: List[str], hits_per_term) -> List[ProductMatch]:
+    """
+    Flattens per-term hits into ProductMatch objects, keeping each document once.
+    """
+    matches = []
+    seen = set()
+    for term, hits in zip(terms, hits_per_term):
+        for doc_id, content, distance in hits:
+            if doc_id in seen or content is None:
+                continue
+            seen.add(doc_id)
+            matches.append(ProductMatch(doc_id, content, distance, term))
+    return matches
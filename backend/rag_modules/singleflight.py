@@ -0,0 +1,75 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Hashable
+
+from ..app.metrics import COALESCED_CALLS
+
+
+class FlightCancelled(RuntimeError):
+    """The shared call was abandoned before finishing (e.g. its client disconnected)."""
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls: while a call for a key is in
+    flight, further calls with that key wait for its result instead of
+    repeating the work. Nothing is kept once the call finishes; use a cache
+    for that.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._flights: Dict[Hashable, asyncio.Future] = {}
+
+    def running(self, key: Hashable):
+        return self._flights.get(key)
+
+    async def join(self, key: Hashable) -> Any:
+        """Waits for the call in flight for `key`; the caller's cancellation does not affect it."""
+        COALESCED_CALLS.inc(self.name)
+        return await asyncio.shield(self._flights[key])
+
+    def _register(self, key: Hashable, future: asyncio.Future):
+        self._flights[key] = future
+
+        def finished(done):
+            if self._flights.get(key) is done:
+                del self._flights[key]
+            # Mark the outcome as seen even if nobody was left to await it
+            if not done.cancelled():
+                done.exception()
+
+        future.add_done_callback(finished)
+
+    async def do(self, key: Hashable, fn) -> Any:
+        """
+        Result of awaiting fn(), shared with every concurrent call for `key`.
+        fn runs as its own task, so it completes for the other callers even if
+        the one that started it is cancelled.
+        """
+        if key in self._flights:
+            return await self.join(key)
+        task = asyncio.ensure_future(fn())
+        self._register(key, task)
+        return await asyncio.shield(task)
+
+    @asynccontextmanager
+    async def lead(self, key: Hashable):
+        """
+        Registers the caller as the one doing the work for `key`, for work that
+        cannot run as a separate task (e.g. a response being streamed). Call
+        set_result on the yielded future when done; leaving the block without
+        doing so fails the followers with the error, or FlightCancelled.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._register(key, future)
+        try:
+            yield future
+        except BaseException as e:
+            if not future.done():
+                error = e if isinstance(e, Exception) else FlightCancelled(f"{self.name} call was cancelled")
+                future.set_exception(error)
+            raise
+        finally:
+            if not future.done():
+                future.set_exception(FlightCancelled(f"{self.name} call finished without a result"))
@@ -0,0 +1,123 @@
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from ..app.metrics import CACHE_ITEMS, CACHE_LOOKUPS
+
+
+class TieredStore:
+    """
+    Values by string key in an in-process LRU in front of a SQLite table
+    (key TEXT PRIMARY KEY, *fixed columns, value column). `encode`/`decode`
+    convert values to and from what is stored; `fixed` columns get the same
+    value on every row (e.g. the embedding model). With path=None only the
+    memory tier is used.
+
+    Lookups are counted in CACHE_LOOKUPS{cache=name} as hit (memory),
+    disk_hit (SQLite) or miss. Safe to use from several threads.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        path: Optional[str],
+        table: str,
+        value_column: str,
+        value_type: str,
+        encode: Callable[[Any], Any],
+        decode: Callable[[Any], Any],
+        max_memory_items: int,
+        fixed: Optional[Dict[str, str]] = None,
+    ):
+        self.name = name
+        self.table = table
+        self.value_column = value_column
+        self.encode = encode
+        self.decode = decode
+        self.max_memory_items = max_memory_items
+        self.fixed = fixed or {}
+        self._memory: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            columns = "".join(f"{column} TEXT NOT NULL, " for column in self.fixed)
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} "
+                f"(key TEXT PRIMARY KEY, {columns}{value_column} {value_type} NOT NULL)"
+            )
+            self._conn.commit()
+
+    def __len__(self):
+        return len(self._memory)
+
+    def _remember(self, key: str, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def _load_from_disk(self, keys: List[str]) -> Dict[str, Any]:
+        if self._conn is None or not keys:
+            return {}
+        found = {}
+        # SQLite caps bound parameters, so look keys up in chunks
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(
+                f"SELECT key, {self.value_column} FROM {self.table} WHERE key IN ({placeholders})", chunk
+            ).fetchall()
+            for key, stored in rows:
+                found[key] = self.decode(stored)
+        return found
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """The stored values of whichever keys are in either tier."""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+            memory_hits = len(found)
+
+            loaded = self._load_from_disk([key for key in keys if key not in found])
+            for key, value in loaded.items():
+                found[key] = value
+                self._remember(key, value)
+            self.memory_hits += memory_hits
+            self.disk_hits += len(loaded)
+            size = len(self._memory)
+
+        CACHE_LOOKUPS.inc(self.name, "hit", amount=memory_hits)
+        CACHE_LOOKUPS.inc(self.name, "disk_hit", amount=len(loaded))
+        CACHE_LOOKUPS.inc(self.name, "miss", amount=len(keys) - len(found))
+        CACHE_ITEMS.set(self.name, value=size)
+        return found
+
+    def set_many(self, values: Dict[str, Any]):
+        if not values:
+            return
+        with self._lock:
+            for key, value in values.items():
+                self._remember(key, value)
+            if self._conn is not None:
+                columns = ", ".join(["key", *self.fixed, self.value_column])
+                placeholders = ",".join("?" * (len(self.fixed) + 2))
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} ({columns}) VALUES ({placeholders})",
+                    [(key, *self.fixed.values(), self.encode(value)) for key, value in values.items()],
+                )
+                self._conn.commit()
+            size = len(self._memory)
+        CACHE_ITEMS.set(self.name, value=size)
@@ -0,0 +1,65 @@
+"""
+Shared fixtures: the advice pipeline runs against the fakes from
+benchmarks/fakes.py, and routes are called in-process with the user and
+their expenses stubbed, so no test needs MongoDB, Chroma or an API key.
+"""
+import json
+import uuid
+
+import httpx
+import pytest
+
+from ..app.routers import advisor_rag
+from ..app.services.auth import get_current_user
+from ..benchmarks.fakes import FakeChroma, FakeEmbeddings, FakeStreamingLLM
+from ..main import app
+from ..rag_modules import pipeline
+
+EXPENSES = [
+    {"amount": 400.0, "category": "Food", "description": "Basmati rice 1000g"},
+    {"amount": 250.0, "category": "Food", "description": "Fresh milk 1 liter"},
+]
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """A fast fake streaming LLM (and fake vector DB) behind the pipeline."""
+    fake = FakeStreamingLLM(first_token_latency=0.01, token_interval=0.001)
+    monkeypatch.setattr(pipeline, "llm", fake)
+    monkeypatch.setattr(pipeline, "db", FakeChroma(FakeEmbeddings(latency=0)))
+    # The in-process product index watches the real chroma.sqlite3
+    monkeypatch.setattr(pipeline, "PRODUCT_INDEX_ENABLED", False)
+    return fake
+
+
+@pytest.fixture
+def user(monkeypatch):
+    """A fresh signed-in user (so cached advice never leaks between tests) with EXPENSES."""
+    email = f"{uuid.uuid4().hex}@test.example"
+    expenses = {email: list(EXPENSES)}
+
+    async def get_user_expenses(user_email):
+        return expenses[user_email]
+
+    monkeypatch.setattr(advisor_rag.dashboard_service, "get_user_expenses", get_user_expenses)
+    app.dependency_overrides[get_current_user] = lambda: email
+    yield email
+    app.dependency_overrides.pop(get_current_user, None)
+
+
+def client():
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def parse_sse(text):
+    """(event, data) pairs of a Server-Sent Events body; unnamed events are "message"."""
+    events = []
+    for block in text.strip().split("\n\n"):
+        event, data = "message", None
+        for line in block.splitlines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+        events.append((event, data))
+    return events
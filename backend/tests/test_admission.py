@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from ..rag_modules import pipeline
+from ..rag_modules.admission import AdmissionController, Overloaded
+from .conftest import client, parse_sse
+
+ADVICE = "/api/advisor/financial-advice"
+
+
+@pytest.fixture
+def saturated(monkeypatch):
+    """An advice controller with one slot and no queue, in place of the shared one."""
+    controller = AdmissionController("advice", max_concurrency=1, max_queue=0, queue_timeout=1)
+    monkeypatch.setattr(pipeline, "advice_admission", controller)
+    return controller
+
+
+def test_admitted_work_does_not_count_toward_the_queue():
+    async def scenario():
+        controller = AdmissionController("test", max_concurrency=1, max_queue=1, queue_timeout=1)
+        release = asyncio.Event()
+
+        async def hold(shed):
+            async with controller.slot(shed=shed):
+                await release.wait()
+
+        holder = asyncio.create_task(hold(True))
+        await asyncio.sleep(0.01)
+        backlog = asyncio.create_task(hold(False))
+        await asyncio.sleep(0.01)
+        assert (controller.active, controller.backlog) == (1, 1)
+        controller.check()  # the queue place is still free
+
+        queued = asyncio.create_task(hold(True))
+        await asyncio.sleep(0.01)
+        with pytest.raises(Overloaded) as rejected:
+            controller.check()
+        assert rejected.value.status_code == 429
+
+        release.set()
+        await asyncio.gather(holder, backlog, queued)
+
+    asyncio.run(scenario())
+
+
+def test_a_miss_is_shed_with_429_while_the_llm_is_saturated(llm, user, saturated):
+    async def scenario():
+        async with saturated.slot(), client() as c:
+            return await c.get(ADVICE)
+
+    response = asyncio.run(scenario())
+    assert response.status_code == 429
+    assert response.headers["retry-after"].isdigit()
+    assert llm.calls == 0
+
+
+def test_cached_advice_is_served_while_the_llm_is_saturated(llm, user, saturated):
+    async def scenario():
+        async with client() as c:
+            first = await c.get(ADVICE)
+            async with saturated.slot():
+                return first, await c.get(ADVICE), await c.get(ADVICE, params={"stream": "true"})
+
+    first, cached, streamed = asyncio.run(scenario())
+    assert first.status_code == cached.status_code == 200
+    assert cached.json() == first.json() == {"advice": llm.reply}
+    assert parse_sse(streamed.text) == [("message", {"token": llm.reply}), ("done", {})]
+    assert llm.calls == 1
+
+
+def test_a_streamed_miss_ends_with_an_error_event_while_saturated(llm, user, saturated):
+    async def scenario():
+        async with saturated.slot(), client() as c:
+            return await c.get(ADVICE, params={"stream": "true"})
+
+    response = asyncio.run(scenario())
+    event, data = parse_sse(response.text)[-1]
+    assert event == "error"
+    assert data["retry_after"] >= 1
+    assert llm.calls == 0
@@ -0,0 +1,64 @@
+import asyncio
+
+from pymongo.errors import PyMongoError
+
+from ..app.services import advice_jobs
+
+
+class FlakyBroker(advice_jobs.MemoryBroker):
+    """A MemoryBroker whose first `failures` claims raise, as an unreachable MongoDB would."""
+
+    def __init__(self, failures=0):
+        super().__init__()
+        self.failures = failures
+        self.renewals = 0
+
+    async def claim(self):
+        if self.failures:
+            self.failures -= 1
+            raise PyMongoError("connection refused")
+        return await super().claim()
+
+    async def renew(self, job):
+        self.renewals += 1
+
+
+def run_worker(monkeypatch, broker, job_seconds=0.0):
+    async def run_job(job):
+        await asyncio.sleep(job_seconds)
+        return {"advice": "Buy rice in bulk."}
+
+    monkeypatch.setattr(advice_jobs, "broker", broker)
+    monkeypatch.setattr(advice_jobs, "run_job", run_job)
+
+    async def scenario():
+        job = await advice_jobs.submit("jobs@test.example")
+        worker = asyncio.create_task(advice_jobs.work())
+        while not broker.empty():
+            await asyncio.sleep(0.005)
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+        return await advice_jobs.get_job(job["job_id"], "jobs@test.example")
+
+    return asyncio.run(scenario())
+
+
+def test_worker_survives_broker_errors(monkeypatch):
+    monkeypatch.setattr(advice_jobs, "ADVICE_JOB_RETRY_SECONDS", 0.01)
+    broker = FlakyBroker(failures=2)
+
+    job = run_worker(monkeypatch, broker)
+
+    assert job["status"] == "done"
+    assert job["result"] == {"advice": "Buy rice in bulk."}
+    assert broker.failures == 0
+
+
+def test_lease_is_renewed_while_a_job_runs(monkeypatch):
+    monkeypatch.setattr(advice_jobs, "ADVICE_JOB_LEASE_SECONDS", 0.03)
+    broker = FlakyBroker()
+
+    job = run_worker(monkeypatch, broker, job_seconds=0.1)
+
+    assert job["status"] == "done"
+    assert broker.renewals >= 2
@@ -0,0 +1,74 @@
+import asyncio
+
+from ..app.metrics import PROMPT_TOKENS
+from ..app.routers import advisor_rag
+from ..app.services.advice import NO_EXPENSES_ADVICE
+from ..rag_modules import pipeline
+from .conftest import client, parse_sse
+
+
+async def stream(path="/api/advisor/financial-advice?stream=true"):
+    async with client() as c:
+        response = await c.get(path)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    return parse_sse(response.text)
+
+
+def test_astream_yields_the_reply_in_chunks(llm):
+    async def collect():
+        return [chunk async for chunk in pipeline.astream_financial_advice("Price: 400. Category: Food.")]
+
+    chunks = asyncio.run(collect())
+    assert len(chunks) > 1
+    assert "".join(chunks) == llm.reply
+    assert llm.calls == 1
+
+
+def test_sse_sends_tokens_then_done(llm, user):
+    events = asyncio.run(stream())
+
+    assert [event for event, _ in events] == ["message"] * (len(events) - 1) + ["done"]
+    assert len(events) > 2
+    assert "".join(data["token"] for _, data in events[:-1]) == llm.reply
+
+
+def test_repeated_request_is_answered_from_the_cache(llm, user):
+    asyncio.run(stream())
+    events = asyncio.run(stream())
+
+    assert events == [("message", {"token": llm.reply}), ("done", {})]
+    assert llm.calls == 1
+
+
+def test_llm_failure_ends_the_stream_with_an_error_event(llm, user, monkeypatch):
+    async def failing_astream(prompt):
+        raise RuntimeError("upstream timeout")
+        yield
+
+    monkeypatch.setattr(llm, "astream", failing_astream)
+    events = asyncio.run(stream())
+
+    event, data = events[-1]
+    assert event == "error"
+    assert "upstream timeout" in data["detail"]
+    assert "done" not in [event for event, _ in events]
+
+
+def test_no_expenses(llm, user, monkeypatch):
+    async def no_expenses(user_email):
+        return []
+
+    monkeypatch.setattr(advisor_rag.dashboard_service, "get_user_expenses", no_expenses)
+    events = asyncio.run(stream())
+
+    assert events == [("message", {"token": NO_EXPENSES_ADVICE}), ("done", {})]
+    assert llm.calls == 0
+
+
+def test_prompt_parts_are_recorded_in_metrics(llm):
+    before = {part: PROMPT_TOKENS.count(part) for part in ("context", "question")}
+    asyncio.run(pipeline.agenerate_financial_advice("Price: 400. Category: Food. Description: Basmati rice 1000g."))
+
+    assert PROMPT_TOKENS.count("context") == before["context"] + 1
+    assert PROMPT_TOKENS.count("question") == before["question"] + 1
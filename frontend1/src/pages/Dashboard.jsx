@@ -6,6 +6,7 @@ import IncomeVsExpenseBar from "../components/charts/IncomeVsExpenseBar";
 import ExpenseByCategoryPie from "../components/charts/ExpenseByCategoryPie";
 import ExpenseByDayLine from "../components/charts/ExpenseByDayLine";
 import cx from "../utils/cx";
+import { applyCategoryTotal, applyEntryResult } from "../utils/tracker";
 
 export default function Dashboard({ apiBase, token, setSuccessMsg, setErrorMsg }) {
   const [month, setMonth] = useState(monthISO());
@@ -16,20 +17,14 @@ export default function Dashboard({ apiBase, token, setSuccessMsg, setErrorMsg }
   const [entryForm, setEntryForm] = useState({
     amount: "", type: "expense", category: "Food", description: "", date: todayISO(),
   });
-  const [refreshKey, setRefreshKey] = useState(0);
 
   async function refetch() {
     const base = apiBase || "";
-    const [tRes, cRes] = await Promise.all([
-      fetch(`${base}/api/dashboard/tracker?month=${month}`, { headers: { Authorization: `Bearer ${token}` } }),
-      fetch(`${base}/api/dashboard/category-totals?month=${month}`, { headers: { Authorization: `Bearer ${token}` } }),
-    ]);
-    if (!tRes.ok) throw new Error(`Tracker error ${tRes.status}`);
-    if (!cRes.ok) throw new Error(`Category totals error ${cRes.status}`);
-    const tData = await tRes.json();
-    const cData = await cRes.json();
-    setTracker(tData);
-    setCategoryTotals(cData);
+    const res = await fetch(`${base}/api/dashboard/month?month=${month}`, { headers: { Authorization: `Bearer ${token}` } });
+    if (!res.ok) throw new Error(`Dashboard error ${res.status}`);
+    const data = await res.json();
+    setTracker(data.tracker);
+    setCategoryTotals(data.category_totals);
     setIncomeForm((f) => ({ ...f, month }));
   }
 
@@ -40,19 +35,10 @@ export default function Dashboard({ apiBase, token, setSuccessMsg, setErrorMsg }
       try { await refetch(); } catch (e) { setErrorMsg(e.message || "Failed to load data"); }
       finally { setLoading(false); }
     })();
-  }, [token, month, apiBase, refreshKey]);
+  }, [token, month, apiBase]);
 
-  const expenseByDay = useMemo(() => {
-    if (!tracker?.entries) return [];
-    const map = new Map();
-    for (const e of tracker.entries) {
-      if (e.type !== "expense") continue;
-      map.set(e.date, (map.get(e.date) || 0) + Number(e.amount || 0));
-    }
-    return Array.from(map.entries())
-      .sort((a, b) => (a[0] < b[0] ? -1 : 1))
-      .map(([date, total]) => ({ date, total: Number(total.toFixed(2)) }));
-  }, [tracker]);
+  // Per-day totals of the whole month, sorted by date; tracker.entries is only its first page
+  const expenseByDay = tracker?.daily_expenses || [];
 
   const incomeVsExpense = useMemo(() => {
     if (!tracker) return [];
@@ -80,9 +66,11 @@ export default function Dashboard({ apiBase, token, setSuccessMsg, setErrorMsg }
         body: JSON.stringify({ amount: Number(incomeForm.amount), month: incomeForm.month }),
       });
       if (!res.ok) throw new Error("Failed to set income");
+      // Another month is loaded by the month change; this one is patched in place
+      const { totals } = await res.json();
+      setTracker((t) => (t && t.month === totals.month ? { ...t, ...totals } : t));
       setMonth(incomeForm.month);
       setSuccessMsg("✅ Monthly income saved.");
-      setRefreshKey((k) => k + 1);
     } catch (e) { setErrorMsg(e.message); }
   }
 
@@ -104,9 +92,11 @@ export default function Dashboard({ apiBase, token, setSuccessMsg, setErrorMsg }
         body: JSON.stringify(payload),
       });
       if (!res.ok) throw new Error("Failed to add entry");
+      const result = await res.json();
+      setTracker((t) => applyEntryResult(t, result));
+      if (result.totals.month === month) setCategoryTotals((c) => applyCategoryTotal(c, result.category_total));
       setEntryForm((f) => ({ ...f, amount: "", description: "" }));
       setSuccessMsg("✅ Entry added.");
-      setRefreshKey((k) => k + 1);
     } catch (e) { setErrorMsg(e.message); }
   }
 
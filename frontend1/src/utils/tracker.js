@@ -0,0 +1,31 @@
+// Apply the result of POST /tracker/entry or /tracker/income to the month
+// already on screen, instead of refetching it.
+
+export function applyEntryResult(tracker, { entry, totals }) {
+  if (!tracker || tracker.month !== totals.month) return tracker;
+  // Entries are newest first; a new entry goes before older dates
+  const at = tracker.entries.findIndex((e) => e.date <= entry.date);
+  const entries = [...tracker.entries];
+  entries.splice(at === -1 ? entries.length : at, 0, entry);
+
+  let daily = tracker.daily_expenses || [];
+  if (entry.type === "expense") {
+    const day = daily.find((d) => d.date === entry.date);
+    daily = day
+      ? daily.map((d) => (d === day ? { ...d, total: Number((d.total + entry.amount).toFixed(2)) } : d))
+      : [...daily, { date: entry.date, total: entry.amount }].sort((a, b) => (a.date < b.date ? -1 : 1));
+  }
+  return {
+    ...tracker,
+    ...totals,
+    entries: entries.slice(0, tracker.limit || entries.length),
+    entries_total: (tracker.entries_total || 0) + 1,
+    daily_expenses: daily,
+  };
+}
+
+export function applyCategoryTotal(categoryTotals, categoryTotal) {
+  if (!categoryTotal) return categoryTotals;
+  const others = categoryTotals.filter((t) => t.category !== categoryTotal.category);
+  return [...others, categoryTotal];
+}
@@ -0,0 +1,51 @@
+// Apply the result of POST /tracker/entry or /tracker/income to the month
+// already on screen, instead of refetching it.
+
+export type MonthTotals = {
+  month: string;
+  monthly_income: number;
+  side_income: number;
+  total_expense: number;
+  net_savings: number;
+  total_income: number;
+};
+export type CategoryTotal = { category: string; total: number };
+export type EntryResult<E> = { entry: E; totals: MonthTotals; category_total: CategoryTotal | null };
+
+type Tracker<E> = MonthTotals & {
+  entries: E[];
+  entries_total: number;
+  limit?: number;
+  daily_expenses: { date: string; total: number }[];
+};
+
+export function applyEntryResult<E extends { type: string; amount: number; date?: string }, T extends Tracker<E>>(
+  tracker: T | null, { entry, totals }: EntryResult<E>,
+): T | null {
+  if (!tracker || tracker.month !== totals.month) return tracker;
+  const date = entry.date || "";
+  // Entries are newest first; a new entry goes before older dates
+  const at = tracker.entries.findIndex(e => (e.date || "") <= date);
+  const entries = [...tracker.entries];
+  entries.splice(at === -1 ? entries.length : at, 0, entry);
+
+  let daily = tracker.daily_expenses || [];
+  if (entry.type === "expense") {
+    const day = daily.find(d => d.date === date);
+    daily = day
+      ? daily.map(d => (d === day ? { ...d, total: Number((d.total + entry.amount).toFixed(2)) } : d))
+      : [...daily, { date, total: entry.amount }].sort((a, b) => (a.date < b.date ? -1 : 1));
+  }
+  return {
+    ...tracker,
+    ...totals,
+    entries: entries.slice(0, tracker.limit || entries.length),
+    entries_total: (tracker.entries_total || 0) + 1,
+    daily_expenses: daily,
+  };
+}
+
+export function applyCategoryTotal(categoryTotals: CategoryTotal[], categoryTotal: CategoryTotal | null) {
+  if (!categoryTotal) return categoryTotals;
+  return [...categoryTotals.filter(t => t.category !== categoryTotal.category), categoryTotal];
+}
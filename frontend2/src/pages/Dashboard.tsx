@@ -10,19 +10,18 @@ import { Card, CardContent, CardHeader, CardTitle } from "@/components/ui/card";
 import { Tabs, TabsContent, TabsList, TabsTrigger } from "@/components/ui/tabs";
 import { CalendarIcon } from "lucide-react";
 import { cn } from "@/lib/utils";
+import { applyCategoryTotal, applyEntryResult, type CategoryTotal, type MonthTotals } from "@/lib/tracker";
 import { format } from "date-fns";
 import { Area, AreaChart, Bar, BarChart, CartesianGrid, Line, LineChart, Pie, PieChart, Tooltip, XAxis, YAxis, ResponsiveContainer, Cell } from "recharts";
 import { useNavigate } from "react-router-dom";
 
 type TrackerEntry = { amount: number; type: 'expense' | 'side-income'; category: string; description: string; date?: string };
-type TrackerData = {
-  monthly_income: number;
-  side_income: number;
-  total_expense: number;
-  net_savings: number;
+type TrackerData = MonthTotals & {
   entries: TrackerEntry[];
+  entries_total: number;
+  limit: number;
+  daily_expenses: { date: string; total: number }[];
 };
-type CategoryTotal = { category: string; total: number };
 const CATS = ["Food","Transport","Utilities","Healthcare","Entertainment","Other"] as const;
 
 export default function Dashboard(){
@@ -42,12 +41,11 @@ export default function Dashboard(){
   async function refetch(){
     const token = localStorage.getItem('gl_token');
     if(!token){ navigate('/auth'); return; }
-    const [tRes, cRes] = await Promise.all([
-      fetch(`/api/dashboard/tracker?month=${month}`, { headers: { Authorization: `Bearer ${token}` } }),
-      fetch(`/api/dashboard/category-totals?month=${month}`, { headers: { Authorization: `Bearer ${token}` } }),
-    ]);
-    if(tRes.ok) setTracker(await tRes.json());
-    if(cRes.ok) setCategoryTotals(await cRes.json());
+    const res = await fetch(`/api/dashboard/month?month=${month}`, { headers: { Authorization: `Bearer ${token}` } });
+    if(!res.ok) return;
+    const data = await res.json();
+    setTracker(data.tracker);
+    setCategoryTotals(data.category_totals);
   }
 
   useEffect(()=>{ refetch(); },[month]);
@@ -60,7 +58,10 @@ export default function Dashboard(){
       method: 'POST', headers: { 'Content-Type': 'application/json', Authorization: `Bearer ${token}` },
       body: JSON.stringify({ amount: incomeAmount, month }),
     });
-    if(res.ok) refetch();
+    if(!res.ok) return;
+    // The response carries the month's updated totals; the entries are unchanged
+    const { totals } = await res.json();
+    setTracker(t => (t && t.month === totals.month ? { ...t, ...totals } : t));
   };
 
   const saveExpense = async () => {
@@ -78,15 +79,14 @@ export default function Dashboard(){
       method: 'POST', headers: { 'Content-Type': 'application/json', Authorization: `Bearer ${token}` },
       body: JSON.stringify(payload),
     });
-    if(res.ok) refetch();
+    if(!res.ok) return;
+    const result = await res.json();
+    setTracker(t => applyEntryResult(t, result));
+    if(result.totals.month === month) setCategoryTotals(c => applyCategoryTotal(c, result.category_total));
   };
 
   // Charts data
-  const days: { day: string; expense: number }[] = (()=>{
-    const map = new Map<string, number>();
-    (tracker?.entries||[]).forEach(e=>{ if(e.type==='expense' && e.date){ map.set(e.date, (map.get(e.date)||0)+Number(e.amount||0)); } });
-    return Array.from(map.entries()).sort((a,b)=>a[0]<b[0]? -1: 1).map(([date,total])=>({ day: date.slice(-2), expense: total }));
-  })();
+  const days: { day: string; expense: number }[] = (tracker?.daily_expenses||[]).map(d=>({ day: d.date.slice(-2), expense: d.total }));
 
   const byCat = (categoryTotals||[]).map(t=>({ name: t.category, value: t.total }));
   const COLORS = ["#10b981","#059669","#34d399","#16a34a","#22c55e","#4ade80"];
@@ -14,39 +14,66 @@ export default function FinancialAdvice(){
   const [month, setMonth] = useState<Date>(new Date());
   const [advice, setAdvice] = useState<string>("");
   const [loading, setLoading] = useState(false);
+  const [streaming, setStreaming] = useState(false);
   const [showContent, setShowContent] = useState(false);
   const navigate = useNavigate();
 
   useEffect(()=>{ document.title = "GreenLedger — Financial Advice"; },[]);
 
-  // Fade-in animation when advice is received
+  // Fade-in animation when the first advice text is received
+  const hasAdvice = advice.length > 0;
   useEffect(() => {
-    if (advice) {
+    if (hasAdvice) {
       setShowContent(false);
       const timer = setTimeout(() => setShowContent(true), 100);
       return () => clearTimeout(timer);
     }
-  }, [advice]);
+  }, [hasAdvice]);
 
   const onAdvice = async () => {
     try{
       setLoading(true);
+      setStreaming(true);
       setAdvice("");
       setShowContent(false);
 
       const token = localStorage.getItem('gl_token');
       if(!token){ navigate('/auth'); return; }
 
-      const res = await fetch('/api/advisor/financial-advice', {
-        headers: { Authorization: `Bearer ${token}` },
+      // Stream the advice as Server-Sent Events so text shows up while it is generated
+      const res = await fetch('/api/advisor/financial-advice?stream=true', {
+        headers: { Authorization: `Bearer ${token}`, Accept: 'text/event-stream' },
       });
-      if(!res.ok){ throw new Error(`Failed (${res.status})`); }
-      const data = await res.json();
-      setAdvice(data?.advice || "");
+      if(res.status === 429 || res.status === 503){
+        const wait = res.headers.get('Retry-After');
+        throw new Error(`The advisor is busy right now. Please try again${wait ? ` in ${wait} s` : ' shortly'}.`);
+      }
+      if(!res.ok || !res.body){ throw new Error(`Failed (${res.status})`); }
+
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      for(;;){
+        const { value, done } = await reader.read();
+        if(done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const events = buffer.split("\n\n");
+        buffer = events.pop() ?? "";
+        for(const raw of events){
+          const event = raw.match(/^event: (.*)$/m)?.[1] ?? "message";
+          const data = JSON.parse(raw.match(/^data: (.*)$/m)?.[1] ?? "{}");
+          if(event === "error"){ throw new Error(data?.detail || "Advice generation failed"); }
+          if(event === "message" && data?.token){
+            setLoading(false);
+            setAdvice(prev => prev + data.token);
+          }
+        }
+      }
     }catch(e:any){
       toast({ title: 'Error', description: e?.message || String(e) });
     }finally{
       setLoading(false);
+      setStreaming(false);
     }
   };
 
@@ -80,7 +107,7 @@ export default function FinancialAdvice(){
           <Button
             variant="hero"
             onClick={onAdvice}
-            disabled={loading}
+            disabled={loading || streaming}
             className="relative overflow-hidden group"
           >
             {loading && (